@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""
+    Compare the 'numpy' and 'struct' cpb decoding engines of
+    icoscp.cpb.decoder on a synthetic payload, shaped like an ATC
+    time series (TIMESTAMP, a float32 value, a flag and an integer).
+
+    Usage:
+        python benchmarks/cpb_decode.py [--rows N] [--repeat R]
+"""
+
+import argparse
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+with warnings.catch_warnings(record=True):
+    # Silence the legacy Dobj import warning of the cpb package.
+    from icoscp.cpb import decoder
+import icoscp.const as CPC
+
+
+def synthetic_payload(rows):
+    """ Return a big endian payload and the matching column description. """
+    rng = np.random.default_rng(seed=42)
+    names = ['Flag', 'NbPoints', 'TIMESTAMP', 'co2']
+    schema = ['CHAR', 'INT', 'DOUBLE', 'FLOAT']
+    formats = [f'{CPC.CP_META}bmpChar', f'{CPC.CP_META}int32',
+               f'{CPC.CP_META}iso8601dateTime', f'{CPC.CP_META}float32']
+    flags = rng.choice(np.array([ord('O'), ord('U'), ord('N')]), rows)
+    columns = [
+        flags.astype('>i2'),
+        rng.integers(0, 60, rows).astype('>i4'),
+        (1.5e12 + 3.6e6 * np.arange(rows)).astype('>f8'),
+        rng.normal(420, 5, rows).astype('>f4'),
+    ]
+    payload = b''.join(c.tobytes() for c in columns)
+    return payload, names, schema, formats
+
+
+def measure(engine, payload, names, schema, formats, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = decoder.unpack(payload, names, schema, formats, rows=rows,
+                            engine=engine)
+        timings.append(time.perf_counter() - start)
+        del df
+    tracemalloc.start()
+    df = decoder.unpack(payload, names, schema, formats, rows=rows,
+                        engine=engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    payload, names, schema, formats = synthetic_payload(args.rows)
+    print(f'{args.rows} rows, payload of {len(payload) / 2**20:.1f} MB')
+
+    results = {}
+    for engine in decoder.ENGINES:
+        df, seconds, peak = measure(engine, payload, names, schema,
+                                    formats, args.rows, args.repeat)
+        results[engine] = df
+        print(f'{engine:>7}: {seconds:8.3f} s, '
+              f'peak memory {peak / 2**20:8.1f} MB')
+
+    # Both engines must return the same data.
+    pd.testing.assert_frame_equal(results['numpy'], results['struct'],
+                                  check_dtype=False)
+
+
+if __name__ == '__main__':
+    main()
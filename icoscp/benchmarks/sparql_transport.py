@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+"""
+    Compare the 'json' and 'csv' transports of RunSparql on a large
+    result: the data objects of all ICOS stations, using
+    sparqls.stationData. Needs access to https://meta.icos-cp.eu.
+
+    Usage:
+        python benchmarks/sparql_transport.py [--level L] [--repeat R]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from icoscp.sparql import sparqls
+from icoscp.sparql.runsparql import RunSparql
+
+
+def station_uris():
+    """ Return the uris of all ICOS stations. """
+    df = RunSparql(sparqls.getStations(), output_format='pandas').run()
+    return df[df['icosClass'].notna()]['uri'].tolist()
+
+
+def measure(query, transport, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = RunSparql(query, output_format='pandas',
+                       transport=transport).run()
+        timings.append(time.perf_counter() - start)
+        del df
+    tracemalloc.start()
+    df = RunSparql(query, output_format='pandas', transport=transport).run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--level', default='all')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    query = sparqls.stationData(station_uris(), level=args.level)
+    results = {}
+    for transport in ['json', 'csv']:
+        df, seconds, peak = measure(query, transport, args.repeat)
+        results[transport] = df
+        print(f'{transport:>5}: {len(df)} rows, {seconds:8.3f} s, '
+              f'peak memory {peak / 2**20:8.1f} MB')
+
+    # Both transports must return the same data.
+    pd.testing.assert_frame_equal(results['json'], results['csv'])
+
+
+if __name__ == '__main__':
+    main()
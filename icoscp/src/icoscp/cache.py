@@ -0,0 +1,184 @@
+"""
+Opt-in on-disk cache of decoded data object columns.
+
+Data objects are immutable, so the decoded columns of a PID can be kept
+on disk and reused across sessions. Each entry is stored as an
+uncompressed numpy ``.npz`` archive in a folder per PID, keyed by the
+column set and row slice of the request. When the cache grows beyond its
+size limit, the least recently used entries are removed.
+
+The cache is disabled by default:
+
+>>> from icoscp import cache
+>>> cache.enable(folder='/tmp/icoscp-cache', max_bytes=2**30)  # doctest: +SKIP
+"""
+
+# Standard library imports.
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any
+
+# Related third party imports.
+import numpy as np
+
+# Local application/library specific imports.
+import icoscp.const as c
+
+ArraysDict = dict[str, np.ndarray]
+
+SUFFIX = ".npz"
+
+
+class DiskCache:
+    def __init__(self, folder: str | None = None,
+                 max_bytes: int = c.CACHE_MAX_BYTES) -> None:
+        """
+        :param folder: Cache folder, created if missing. The default is
+          ~/.cache/icoscp.
+        :param max_bytes: Size limit of the cache on disk.
+        """
+        self.folder = os.path.abspath(
+            os.path.expanduser(folder or c.CACHE_FOLDER))
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        # Running size of the cache, counted by a walk of the folder and
+        # grown by each store, so that stores do not walk the folder
+        # until it may be full. None until the first walk.
+        self._size: int | None = None
+        os.makedirs(self.folder, exist_ok=True)
+
+    def load(self, pid: str, key: Any) -> ArraysDict | None:
+        """
+        Return the arrays stored for (pid, key), or None on a miss.
+        """
+        path = self._path(pid, key)
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                arrays = {name: archive[name] for name in archive.files}
+            # The access time orders entries for eviction, it is set
+            # explicitly since file systems are often mounted noatime.
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except (OSError, ValueError):
+            return None
+        return arrays
+
+    def store(self, pid: str, key: Any, arrays: ArraysDict) -> bool:
+        """
+        Store arrays for (pid, key) and evict old entries if the cache
+        is full. Arrays of python objects are not cached.
+
+        :return: True if the arrays were stored.
+        """
+        if any(a.dtype.hasobject for a in arrays.values()):
+            return False
+        path = self._path(pid, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so that concurrent readers
+        # never see a partial entry.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+                stored = f.tell()
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+        with self._lock:
+            # A replaced entry is counted twice until the next walk.
+            if self._size is not None:
+                self._size += stored
+            full = self._size is None or self._size > self.max_bytes
+        if full:
+            self.evict()
+        return True
+
+    def invalidate(self, pid: str) -> None:
+        """Remove all entries of a PID."""
+        shutil.rmtree(self._pid_folder(pid), ignore_errors=True)
+        self._size = None
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for name in os.listdir(self.folder):
+            shutil.rmtree(os.path.join(self.folder, name),
+                          ignore_errors=True)
+        self._size = None
+
+    def size(self) -> int:
+        """Size of the cache in bytes."""
+        return sum(st.st_size for _, st in self._entries())
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until below max_bytes. The
+        whole folder is walked, including the .json entries which are
+        not written by store().
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1].st_atime)
+            total = sum(st.st_size for _, st in entries)
+            for path, st in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= st.st_size
+            self._size = total
+
+    def _entries(self) -> list[tuple[str, os.stat_result]]:
+        entries = []
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                # Metadata documents of icoscp.metacache and sparql results
+                # of icoscp.sparql.resultcache are .json files.
+                if name.endswith((SUFFIX, ".json")):
+                    path = os.path.join(root, name)
+                    try:
+                        entries.append((path, os.stat(path)))
+                    except OSError:
+                        continue
+        return entries
+
+    def _pid_folder(self, pid: str) -> str:
+        pid_id = pid.rstrip("/").split("/")[-1]
+        return os.path.join(self.folder, pid_id)
+
+    def _path(self, pid: str, key: Any) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self._pid_folder(pid), digest + SUFFIX)
+
+
+_cache: DiskCache | None = None
+
+
+def enable(folder: str | None = None,
+           max_bytes: int = c.CACHE_MAX_BYTES) -> DiskCache:
+    """
+    Cache the data of all Dobj.get() calls on disk.
+
+    :param folder: Cache folder, the default is ~/.cache/icoscp.
+    :param max_bytes: Size limit of the cache on disk, 1 GiB by default.
+    :return: The active cache.
+    """
+    global _cache  # noqa: PLW0603
+    _cache = DiskCache(folder=folder, max_bytes=max_bytes)
+    return _cache
+
+
+def disable() -> None:
+    """Stop caching. Cached entries are kept on disk."""
+    global _cache  # noqa: PLW0603
+    _cache = None
+
+
+def active() -> DiskCache | None:
+    """The active cache, None if caching is disabled."""
+    return _cache
@@ -29,7 +29,7 @@ from icoscp.sparql import sparqls
 from icoscp.cpb.dobj import Dobj
 from tqdm import tqdm
 import pandas as pd
-import requests
+from icoscp import session
 
 
 # ----------------------------------------------
@@ -205,7 +205,7 @@ class Collection():
         lang = ''.join(['&lang=', 'en-GB'])
         query = ''.join([url,doi, style, lang])
         
-        r = requests.get(query)
+        r = session.get(query)
         return(r.content.decode('UTF-8'))
 
                
@@ -252,20 +252,15 @@ def getIdList():
     query = sparqls.collections()
     coll = RunSparql(query,'pandas').run()
     
-    # register tqdm with pandas then change .apply to .progress_apply
-    # would be nice, but creates warning with future ...
-    # tqdm.pandas()    
-    
-    # add count of data sets
-    coll['dobj'] = coll.apply(lambda x : __itemCount(x['collection']), axis=1)
-    coll['count'] = coll.apply(lambda x : len(x.dobj), axis=1)
+    # add the data sets and their count, for all collections in one query
+    query = sparqls.collection_members()
+    members = RunSparql(query,'pandas').run()
+    members = members.set_index('collection')
+    items = members.dobj.reindex(coll.collection)
+    coll['dobj'] = [x.split() if isinstance(x, str) else [] for x in items]
+    coll['count'] = coll.dobj.map(len)
     
     return coll
-
-def __itemCount(id):
-    query = sparqls.collection_items(id)
-    item = RunSparql(query,'pandas').run()
-    return item.dobj.to_list()
     
 # ------------------------------------------------------------    
 if __name__ == "__main__":
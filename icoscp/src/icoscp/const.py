@@ -13,3 +13,42 @@ DOC_FAQ_WARNINGS = 'https://icos-carbon-portal.github.io/pylib/faq/#how-do-i-sup
 ICOS_LANDING_PAGE_PREFIX = "https://meta.icos-cp.eu/objects"
 ICOS_HANDLE_PREFIX = "11676"
 FLOAT_64_VALUEFORMAT = "http://meta.icos-cp.eu/ontologies/cpmeta/float64"
+
+# Shared HTTP session, see icoscp.session
+# (connect, read) timeout, long enough for large downloads and queries
+HTTP_SESSION_TIMEOUT_SEC = (10, 300)
+HTTP_POOL_CONNECTIONS = 10
+HTTP_POOL_MAXSIZE = 10
+
+# Opt-in on-disk cache of data objects, see icoscp.cache
+CACHE_FOLDER = '~/.cache/icoscp'
+CACHE_MAX_BYTES = 2**30
+
+# Data usage reporting, see icoscp.portaluse
+PORTAL_USE = 'https://cpauth.icos-cp.eu/logs/portaluse'
+PORTAL_USE_QUEUE_SIZE = 1000
+PORTAL_USE_TIMEOUT_SEC = 5
+PORTAL_USE_FLUSH_TIMEOUT_SEC = 2
+
+# Cache of data object metadata, see icoscp.metacache
+META_CACHE_ENTRIES = 1024
+META_CACHE_MAX_AGE_SEC = 600
+
+# Concurrent metadata requests of Dobj.from_many
+DOBJ_MAX_WORKERS = 8
+
+# Rows per chunk of Dobj.iter_chunks
+DOBJ_CHUNK_ROWS = 1_000_000
+
+# Size of the pieces of a streamed sparql result, see RunSparql.iter_rows
+SPARQL_CHUNK_SIZE = 2**16
+# Accept header of the csv transport of RunSparql, json as fallback
+SPARQL_CSV_ACCEPT = ('text/csv, application/sparql-results+json;q=0.5, '
+                     'application/json;q=0.4')
+# Opt-in cache of sparql results, see icoscp.sparql.resultcache
+SPARQL_CACHE_TTL_SEC = 3600
+SPARQL_CACHE_MAX_BYTES = 2**28
+# Queries sent at the same time by RunSparql.arun, like HTTP_POOL_MAXSIZE
+SPARQL_MAX_CONCURRENCY = 10
+# Pages requested at the same time by a paged RunSparql query
+SPARQL_PAGE_WORKERS = 4
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+
+"""
+    Decode the binary (cpb) representation of ICOS data objects.
+
+    A cpb payload is column-contiguous: the values of the first column
+    are followed by the values of the second column and so on, the
+    columns being sorted by name. Two engines are available:
+
+    - 'numpy' (default) builds each column as a numpy array directly
+      over the payload and converts time columns with vectorized
+      datetime64 arithmetic.
+    - 'struct' is the original implementation, which unpacks the
+      whole payload into a python tuple.
+"""
+
+import mmap
+import struct
+
+import numpy as np
+import pandas as pd
+
+import icoscp.const as CPC
+from icoscp.cpb import dtype
+
+# Stored as seconds since midnight.
+TIME_FORMATS = [f'{CPC.CP_META}{f}' for f in ['iso8601timeOfDay']]
+# Stored as days since epoch.
+DATE_FORMATS = [f'{CPC.CP_META}{f}' for f in ['iso8601date', 'etcDate']]
+# Stored as milliseconds since epoch.
+DATETIME_FORMATS = [f'{CPC.CP_META}{f}' for f in ['iso8601dateTime',
+                                                  'isoLikeLocalDateTime',
+                                                  'etcLocalDateTime']]
+# Stored as integer.
+INTEGER_FORMATS = [f'{CPC.CP_META}{f}' for f in ['int32']]
+
+ENGINES = ['numpy', 'struct']
+
+# Bytes read at a time from a streamed payload.
+CHUNK_SIZE = 2**20
+
+
+def column_dtype(columnDescriptor, endianness='big'):
+    """ Return the numpy.dtype of a single value for a column descriptor
+        (output from dtype.map_type), or None if the column can not be
+        represented by a numpy array.
+    """
+    try:
+        element = np.dtype(dtype.numpyTypes(columnDescriptor)).base
+    except TypeError:
+        return None
+    return element.newbyteorder(dtype.numpyEndian(endianness))
+
+
+def unpack(rawData, names, schema, formats, *,  # noqa: PLR0913
+           rows, endianness='big', engine='numpy'):
+    """
+    Decode a cpb payload into a pandas data frame.
+
+    Parameters
+    ----------
+    rawData : bytes-like object
+        The binary payload, containing the values of all the columns
+        described by names, schema and formats, in that order.
+    names : LIST[STR]
+        Column names.
+    schema : LIST[STR]
+        Column descriptors, see dtype.map_type.
+    formats : LIST[STR]
+        Value format urls of the columns.
+    rows : INT
+        Number of values per column.
+    endianness : STR, optional
+        The default is 'big'.
+    engine : STR, optional
+        'numpy' (default) or 'struct'. Payloads with columns that numpy
+        can not represent are always decoded with 'struct'.
+
+    Returns
+    -------
+    PANDAS DATAFRAME
+    """
+    if engine not in ENGINES:
+        msg = f'Unknown engine {engine}, use one of {ENGINES}'
+        raise ValueError(msg)
+    offsets = column_offsets(schema, rows, endianness)
+    if engine == 'numpy' and offsets is not None:
+        values = views(rawData, schema, rows, offsets, endianness)
+        return frame(names, schema, formats, values)
+    return _struct_frame(rawData, list(zip(names, schema, formats)), rows,
+                         endianness)
+
+
+def column_offsets(schema, rows, endianness='big'):
+    """
+    Byte offsets of the columns within a payload holding all the columns
+    of schema, or None if any of the columns can not be represented by a
+    numpy array.
+    """
+    offsets = []
+    offset = 0
+    for desc in schema:
+        col_dtype = column_dtype(desc, endianness)
+        if col_dtype is None:
+            return None
+        offsets.append(offset)
+        offset += rows * col_dtype.itemsize
+    return offsets
+
+
+def views(rawData, schema, rows, offsets, endianness='big'):
+    """
+    Zero-copy numpy views of the columns described by schema, starting
+    at the byte offsets within rawData.
+    """
+    return [np.frombuffer(rawData, dtype=column_dtype(desc, endianness),
+                          count=rows, offset=offset)
+            for desc, offset in zip(schema, offsets)]
+
+
+def mmap_columns(path, schema, selected, rows, endianness='big'):
+    """
+    Memory-map a local .cpb file and return zero-copy numpy views for the
+    selected column numbers only. Only the pages holding these columns
+    are read from disk. Returns None if the column offsets can not be
+    computed from the schema.
+
+    Parameters
+    ----------
+    path : STR
+        Path to the .cpb file.
+    schema : LIST[STR]
+        Column descriptors for ALL the columns in the file, sorted by
+        column name.
+    selected : LIST[INT]
+        Column numbers to return.
+    rows : INT
+        Number of rows in the file.
+    endianness : STR, optional
+        The default is 'big'.
+
+    Returns
+    -------
+    LIST[NUMPY.NDARRAY] | None
+    """
+    offsets = column_offsets(schema, rows, endianness)
+    if offsets is None:
+        return None
+    selected_schema = [schema[col] for col in selected]
+    if not rows:
+        return views(b'', selected_schema, 0, [0] * len(selected))
+    with open(path, 'rb') as binData:
+        # The map stays valid after the file is closed, and is released
+        # with the last view referencing it.
+        mapped = mmap.mmap(binData.fileno(), 0, access=mmap.ACCESS_READ)
+    return views(mapped, selected_schema, rows,
+                 [offsets[col] for col in selected], endianness)
+
+
+def stream_columns(chunks, schema, rows, endianness='big'):
+    """
+    Read a cpb payload from an iterable of byte chunks (for example
+    requests.Response.iter_content) straight into preallocated numpy
+    buffers, one per column. The payload is never held in memory as a
+    whole, and decoding overlaps with the transfer.
+
+    Parameters
+    ----------
+    chunks : ITERABLE[BYTES]
+    schema : LIST[STR]
+        Column descriptors of the columns contained in the payload.
+    rows : INT
+        Number of values per column.
+    endianness : STR, optional
+        The default is 'big'.
+
+    Returns
+    -------
+    LIST[NUMPY.NDARRAY]
+    """
+    buffers = [np.empty(rows, dtype=column_dtype(desc, endianness))
+               for desc in schema]
+    targets = [memoryview(buf.view(np.uint8)) for buf in buffers]
+    col, pos = 0, 0
+    for chunk in chunks:
+        view = memoryview(chunk)
+        while view.nbytes:
+            # skip filled (or empty) columns
+            while col < len(targets) and pos == targets[col].nbytes:
+                col, pos = col + 1, 0
+            if col == len(targets):
+                break
+            n = min(view.nbytes, targets[col].nbytes - pos)
+            targets[col][pos:pos + n] = view[:n]
+            view = view[n:]
+            pos += n
+    received = sum(t.nbytes for t in targets[:col]) + pos
+    expected = sum(t.nbytes for t in targets)
+    if received < expected:
+        msg = (f'Incomplete cpb payload, received {received} '
+               f'of {expected} bytes')
+        raise OSError(msg)
+    return buffers
+
+
+def frame(names, schema, formats, values):
+    """ Convert numpy columns and build the data frame at once. """
+    data = {name: convert(vals, desc, fmt)
+            for name, desc, fmt, vals in zip(names, schema, formats, values)}
+    return pd.DataFrame(data, copy=False)
+
+
+def convert(values, columnDescriptor, valueFormat):
+    """ Convert the raw values of a column to the types used in the
+        returned data frame.
+    """
+    values = _native(values)
+    if columnDescriptor == 'CHAR':
+        # UTF-16 code units, which are often used in "Flag" columns.
+        codes = values.astype(np.uint32)
+        codes &= 0xFFFF
+        return codes.view('U1')
+    if valueFormat in DATETIME_FORMATS:
+        return _ms_to_datetime64(values)
+    if valueFormat in DATE_FORMATS:
+        return values.astype('datetime64[D]').astype('datetime64[ns]')
+    if valueFormat in TIME_FORMATS:
+        return values.astype('datetime64[s]').astype('datetime64[ns]')
+    if columnDescriptor in ['FLOAT', 'DOUBLE']:
+        return values.astype(np.float64, copy=False)
+    # Keep years and other integers as integers.
+    return values.astype(np.int64, copy=False)
+
+
+def _native(values):
+    """ Values in native byte order, swapped in place when possible. """
+    if values.dtype.isnative:
+        return values
+    native = values.dtype.newbyteorder('=')
+    if values.flags.writeable and values.flags.owndata:
+        return values.byteswap(inplace=True).view(native)
+    return values.astype(native)
+
+
+def _ms_to_datetime64(values):
+    """ Milliseconds since epoch (float) to datetime64[ns], NaN to NaT. """
+    ms = values.astype(np.float64)
+    missing = np.isnan(ms)
+    ms[missing] = 0
+    whole = np.floor(ms)
+    ns = whole.astype(np.int64) * 1_000_000
+    ns += np.round((ms - whole) * 1e6).astype(np.int64)
+    ns[missing] = np.iinfo(np.int64).min
+    return ns.view('datetime64[ns]')
+
+
+def _struct_frame(rawData, columns, rows, endianness):
+    # unpack the binary data
+    fmt = dtype.endian(endianness) + \
+        ''.join([dtype.struct(desc, rows) for _, desc, _ in columns])
+    data = struct.unpack_from(fmt, rawData)
+
+    # get them into a pandas data frame, column by column
+    df = pd.DataFrame()
+    for idx, (name, desc, value_format) in enumerate(columns):
+        lst = list(data[idx*rows:(idx+1)*rows])
+        if desc == 'CHAR':
+            # Convert UTF-16, which is often used in "Flag"
+            # columns.
+            lst = [chr(i) for i in lst]
+        elif value_format in DATETIME_FORMATS:
+            lst = pd.to_datetime(lst, unit='ms')
+        elif value_format in DATE_FORMATS:
+            lst = pd.to_datetime(lst, unit='D')
+        elif value_format in TIME_FORMATS:
+            lst = pd.to_datetime(lst, unit='s')
+        elif value_format in INTEGER_FORMATS:
+            # Keep years and other integers as integers.
+            pass
+        df = pd.concat([df, pd.Series(lst).rename(name)], axis=1)
+    return df
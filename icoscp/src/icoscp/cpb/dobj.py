@@ -2,7 +2,6 @@
 from typing import Optional
 from warnings import warn
 import os
-import struct
 
 # Related third party imports.
 import pandas as pd
@@ -11,8 +10,15 @@ import requests
 # Local application/library specific imports.
 from icoscp import __version__ as release_version
 from icoscp import cpauth
+from icoscp.cpb import decoder
 from icoscp.cpb import dtype
 from icoscp.cpb import metadata
+from icoscp import cache
+from icoscp import dtypepolicy
+from icoscp import portaluse
+from icoscp import session
+from icoscp import rowwindow
+from icoscp import tableformat
 import icoscp.const as CPC
 
 
@@ -33,14 +39,21 @@ class Dobj():
         self._colSchema = None      # format of columns (read struct bin data)
         self._struct = None         # format of columns (read struct bin data)
         self._json = None           # holds the "payload" for requests
+        self._slice = None          # (offset, length) of the returned rows
+                                    # 'none' -> ALL rows are returned
+        self._rowMask = None        # rows to keep within the slice, if the
+                                    # TIMESTAMP column is not sorted
         self._islocal = None        # status if file is read from local store
                                     # if localpath + dobj is valid
 
         self._dobjValid = False     # -> see __set_meta()
-        self._data = pd.DataFrame() # This holds the data pandas dataframe
+        self._columns = {}          # Decoded columns of all rows, by name,
                                     # persistent in the object.
         self._datapersistent = True # If True (default), data is kept persistent
-                                    # in self._data. If False, force to reload
+                                    # in self._columns. If False, force to reload
+        self._chunking = None       # state of a running iter_chunks(): the
+                                    # mapped columns and whether the data
+                                    # usage is reported already
         # this needs to be the last call within init. If dobj is provided
         # meta data is retrieved and .valid is True
         self.dobj = digitalObject
@@ -215,11 +228,50 @@ class Dobj():
         
         return self.meta['references'][citfmt[format]]
 
+    def iter_chunks(self, columns=None, rows_per_chunk=CPC.DOBJ_CHUNK_ROWS,
+                    dtypes=None):
+        '''
+        Iterate over the data in chunks of rows. Each chunk is a row
+        window of .get(), read from the memory-mapped local file or
+        downloaded as a row slice, so that the whole data object is
+        never held in memory.
+
+        Parameters
+        ----------
+        columns : LIST[STR], optional
+            Column names, the default is None for all columns.
+        rows_per_chunk : INT, optional
+            Maximum number of rows of a chunk.
+        dtypes : icoscp.dtypepolicy.DtypePolicy, optional
+            See .get()
+
+        Yields
+        ------
+        PANDAS DATAFRAME
+        '''
+        if rows_per_chunk < 1:
+            msg = (f"The value provided for the 'rows_per_chunk' parameter "
+                   f"({rows_per_chunk}) must be positive")
+            raise ValueError(msg)
+        if not self._dobjValid:
+            return
+        nRows = int(self.meta['specificInfo']['nRows'])
+        # The local file is mapped, and the data usage reported, once
+        # for all chunks.
+        self._chunking = {'mapped': {}, 'reported': False}
+        try:
+            for offset in range(0, nRows, rows_per_chunk):
+                yield self.get(columns, offset=offset, length=rows_per_chunk,
+                               dtypes=dtypes)
+        finally:
+            self._chunking = None
+
     def getColumns(self, columns=None):
         ''' see help for .get() '''
         return self.get(columns)
     
-    def get(self, columns=None):
+    def get(self, columns=None, *,  # noqa: PLR0913
+            start=None, end=None, offset=None, length=None, dtypes=None):
 
         '''
         Access to the data. Returns all OR selected columns from the server.
@@ -227,13 +279,31 @@ class Dobj():
         If columns are not provided, all columns will be returned
         which is the same as .data OR .get
         
-        If the data has already been downloaded and stored in the object
-        the existing data frame is returned.
+        Columns which have already been downloaded are kept in the
+        object, only the missing columns are downloaded.
+
+        Only a window of rows can be requested, either by time with
+        start/end or by row numbers with offset/length. Only these rows
+        are downloaded. The time window is looked up in the TIMESTAMP
+        column, by binary search if it is sorted. Windows are never
+        stored in the object.
 
         Parameters
         ----------
         columns : LIST[STR]
             Provide a list of strings (column names)
+        start : STR | DATETIME, optional
+            First time to include (UTC), anything understood by
+            pandas.Timestamp.
+        end : STR | DATETIME, optional
+            First time to exclude (UTC).
+        offset : INT, optional
+            Number of heading rows to skip.
+        length : INT, optional
+            Number of rows to return.
+        dtypes : icoscp.dtypepolicy.DtypePolicy, optional
+            Column types, like icoscp.dtypepolicy.LEAN. The number of
+            bytes saved is reported in df.attrs['bytes_saved'].
 
         Returns
         -------
@@ -243,20 +313,63 @@ class Dobj():
         
         if not self._dobjValid:
             return 
-        
-        #check if the data is alreday present and persistent is true.
-        # return the existing dataframe in self._data
-        if not self._data.empty and self._datapersistent:
-            return self._data
 
-        # if datapersistence is false or the data is missing download..
         # if columns = None, return ALL columns, otherwise,
         # try to extract only a subset of columns
-       
         self.__setColumns(columns)
-        self.__getPayload()
+        self.__setSlice(start, end, offset, length)
+
+        # if datapersistence is true, serve the columns kept in the
+        # object and download only the missing ones
+        df = None
+        if self._datapersistent:
+            names = self.__selection()[0]
+            if self._slice is None:
+                self.__loadMissing(names)
+            if all(n in self._columns for n in names):
+                df = self.__assemble(names)
+        if df is None:
+            self.__getPayload()
+            df = self.__getColumns()
+
+        if dtypes is not None:
+            formats = dict(zip(self.variables['name'],
+                               self.variables['format']))
+            df = dtypepolicy.apply(df, dtypes, formats)
+        return df
+
+    def __loadMissing(self, names):
+        """ Download the columns which are not kept in the object yet. """
+        selected = self._colSelected
+        missing = [col for col, name in zip(selected, names)
+                   if name not in self._columns]
+        if not missing:
+            return
+        self._colSelected = missing
+        try:
+            self.__getPayload()
+            df = self.__getColumns()
+        finally:
+            self._colSelected = selected
+        self._columns.update(df.items())
 
-        return self.__getColumns()
+    def __assemble(self, names):
+        """
+            Data frame of kept columns. Only the rows of the slice are
+            taken, and only shared where pandas copies on write, see
+            tableformat.to_pandas.
+        """
+        columns = {n: self._columns[n] for n in names}
+        if self._slice is not None:
+            offset, length = self._slice
+            columns = {n: v.iloc[offset:offset + length]
+                       for n, v in columns.items()}
+        df = tableformat.to_pandas(columns, shared=names)
+        if self._rowMask is not None:
+            df = df[self._rowMask]
+        # Set in place, reset_index copies before pandas 3.
+        df.index = pd.RangeIndex(len(df))
+        return df
 
 
 # -------------------------------------------------
@@ -273,6 +386,10 @@ class Dobj():
         else:
             # set conveniance excerpts from meta
             self._variables = metadata.variables(self._meta)
+            # create the dataType format, neccesary to interpret the
+            # binary data, AFTER sorting the variable names
+            fmt = self._variables.sort_values('name')['format'].tolist()
+            self._colSchema = [dtype.map_type(f) for f in fmt]
             return True
         
         
@@ -284,14 +401,7 @@ class Dobj():
             if successful _dobjValid is "True"
         """
 
-        # extract the col formats, AFTER sorting the variable names        
-        # create the dataType format, neccesary to interpret the binary
-        # data with python struct library or numpy
-        fmt = self.variables.sort_values('name')['format'].tolist()
-        self._colSchema = [dtype.map_type(f) for f in fmt]
-        
-        
-        rows = int(self.meta['specificInfo']['nRows'])
+        rows = self.__rows()
         
         # possibly we don't need all the schema.. only the ones from
         # selected columns, which gives us the structure of the returned binary
@@ -309,6 +419,9 @@ class Dobj():
                     'columnNumbers':self._colSelected,
                     'subFolder':self.meta['specification']['format']['uri'].split('/')[-1]
             }
+        if self._slice is not None:
+            self._json['slice'] = {'offset': self._slice[0],
+                                   'length': self._slice[1]}
 
         self._dobjValid = True
         return
@@ -320,99 +433,189 @@ class Dobj():
             otherwise try to download from the cp server
         """
 
-        # Assemble local file path.
-        folder = self.meta['specification']['format']['uri'].split('/')[-1]
-        fileName = ''.join([self.dobj.split('/')[-1],'.cpb'])
-        local_file = os.path.abspath(f'{CPC.LOCALDATA}{folder}/{fileName}')
+        # Columns stored in the disk cache by an earlier request.
+        values = self.__cacheLoad()
+        if values is not None:
+            return self.__unpackColumns(values)
+
+        local_file = self.__localFile()
+        nRows = int(self.meta['specificInfo']['nRows'])
+        offset, length = self._slice or (0, nRows)
         # Local access on server.
         if os.path.isfile(local_file):
             self._islocal = True
+            values = self.__mapColumns(local_file, nRows)
+            # Track data usage for data access on server.
+            self.__portalUse()
+            if values is not None:
+                return self.__unpackColumns(
+                    [v[offset:offset + length] for v in values])
+            # Column offsets are unknown, read the whole file.
             with open(local_file, 'rb') as binData:
                 content = binData.read()
-            # For local files, we always return all columns.
             self._colSelected = list(range(0, len(self.variables)))
             self.__getPayload()
-            # Track data usage for data access on server.
-            self.__portalUse()
+            return self.__unpackRawData(content, nRows,
+                                        window=(offset, length))
         # Access through HTTP request.
-        else:
-            self._islocal = False
-            response, content = None, None
-            request_url, request_headers = None, None
-            request_url = CPC.SECURED_DATA
-            request_headers = {'cookie': cpauth.cookie_value}
-            # Request secure data.
-            response = requests.post(url=request_url,
-                                     json=self._json,
-                                     stream=True,
-                                     headers=request_headers)
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                raise e
-            else:
-                if response.status_code == 200:
-                    content = response.content
-                    # Track usage for data access.
+        self._islocal = False
+        schema = [self._colSchema[c] for c in self._colSelected]
+        if not length:
+            # Nothing to download.
+            return self.__unpackColumns(
+                decoder.views(b'', schema, 0, [0] * len(schema)))
+        request_url = CPC.SECURED_DATA
+        content = None
+        # Release the pooled connection, also if decoding fails.
+        with self.__post(self._json) as response:
+            if response.status_code == 200:
+                if decoder.column_offsets(schema, length) is not None:
+                    # Stream the body straight into the column buffers.
+                    values = decoder.stream_columns(
+                        response.iter_content(chunk_size=decoder.CHUNK_SIZE),
+                        schema, length, endianness=self._endian)
                     self.__portalUse(service=request_url)
-        return self.__unpackRawData(content)
+                    self.__cacheStore(values)
+                    return self.__unpackColumns(values)
+                content = response.content
+                # Track usage for data access.
+                self.__portalUse(service=request_url)
+        return self.__unpackRawData(content, length)
+
+    def __mapColumns(self, local_file, rows):
+        """ Memory-mapped selected columns of the local file, mapped
+            only once for all chunks of iter_chunks().
+        """
+        mapped = self._chunking['mapped'] if self._chunking else {}
+        key = tuple(self._colSelected)
+        if key not in mapped:
+            # Map only the pages of the selected columns into memory.
+            mapped[key] = decoder.mmap_columns(
+                local_file, self._colSchema, self._colSelected,
+                rows=rows, endianness=self._endian)
+        return mapped[key]
+
+    def __cacheKey(self):
+        """ Disk cache key of the selected columns and rows. """
+        return ('cpb', tuple(self.__selection()[0]), self._slice)
+
+    def __cacheLoad(self):
+        """ Raw column values from the disk cache, or None. """
+        disk = cache.active()
+        if disk is None:
+            return None
+        if self.next:
+            # Superseded by a new version, free the space.
+            disk.invalidate(self.dobj)
+            return None
+        arrays = disk.load(self.dobj, self.__cacheKey())
+        if arrays is None:
+            return None
+        return [arrays[name] for name in self.__selection()[0]]
+
+    def __cacheStore(self, values):
+        """ Store raw column values in the disk cache, if enabled. """
+        disk = cache.active()
+        if disk is not None and not self.next:
+            names = self.__selection()[0]
+            disk.store(self.dobj, self.__cacheKey(), dict(zip(names, values)))
+
+    def __post(self, payload):
+        """ Request secure data. """
+        response = session.post(url=CPC.SECURED_DATA,
+                                json=payload,
+                                stream=True,
+                                headers={'cookie': cpauth.cookie_value})
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            raise e
+        return response
 
-    def __unpackRawData(self, rawData):
-        # unpack the binary data
-        data = struct.unpack_from(self._struct, rawData)
+    def __localFile(self):
+        """ Path of the binary file on the ICOS Jupyter Hub. """
+        folder = self.meta['specification']['format']['uri'].split('/')[-1]
+        fileName = ''.join([self.dobj.split('/')[-1],'.cpb'])
+        return os.path.abspath(f'{CPC.LOCALDATA}{folder}/{fileName}')
 
-        # get them into a pandas data frame, column by column
-        df = pd.DataFrame()        
-        columns = self.variables['name'].tolist()
-        
+    def __rows(self):
+        """ Number of rows to be returned. """
+        if self._slice is not None:
+            return self._slice[1]
+        return int(self.meta['specificInfo']['nRows'])
+
+    def __setSlice(self, start=None, end=None, offset=None, length=None):
+        """
+            Set self._slice (and self._rowMask) from either a time
+            window or a row window, see .get()
+        """
+        self._slice, self._rowMask = None, None
+        if start is not None or end is not None:
+            if offset is not None or length is not None:
+                msg = 'Provide either start/end or offset/length, not both.'
+                raise ValueError(msg)
+            offset, length, self._rowMask = rowwindow.time_window(
+                self.__timestamps(), start, end)
+        if offset is not None or length is not None:
+            self._slice = rowwindow.check_window(
+                offset, length, int(self.meta['specificInfo']['nRows']))
+
+    def __timestamps(self):
+        """ Values of the TIMESTAMP column. The column is read like any
+            other column, and kept in the object if data persistence is
+            on, so that further time windows need no download.
+        """
+        if self._datapersistent and 'TIMESTAMP' in self._columns:
+            return self._columns['TIMESTAMP'].to_numpy()
+        columns = sorted(self.variables['name'].tolist())
+        if 'TIMESTAMP' not in columns:
+            msg = f'{self.dobj} has no TIMESTAMP column'
+            raise ValueError(msg)
+        selected = self._colSelected
+        self._colSelected = [columns.index('TIMESTAMP')]
+        try:
+            self.__getPayload()
+            df = self.__getColumns()
+        finally:
+            self._colSelected = selected
+        if self._datapersistent:
+            self._columns['TIMESTAMP'] = df['TIMESTAMP']
+        return df['TIMESTAMP'].to_numpy()
+
+    def __unpackRawData(self, rawData, rows, window=None):
+        names, schema, formats = self.__selection()
+        try:
+            df = decoder.unpack(rawData, names, schema, formats,
+                                rows=rows, endianness=self._endian)
+        except Exception as e:
+            msg = '_unpackRawData'
+            raise Exception(msg) from e
+        if window is not None:
+            offset, length = window
+            df = df.iloc[offset:offset + length].reset_index(drop=True)
+        return self.__convert(df)
+
+    def __unpackColumns(self, values):
+        names, schema, formats = self.__selection()
+        try:
+            df = decoder.frame(names, schema, formats, values)
+        except Exception as e:
+            msg = '_unpackColumns'
+            raise Exception(msg) from e
+        return self.__convert(df)
+
+    def __selection(self):
+        """ names, schema and value formats of the selected columns """
         # make sure the list is sorted by variable name, this is how the
         # binary fileformat is built.
+        columns = self.variables['name'].tolist()
         columns.sort()
-
-        # Patch code for timestamp conversions. To be reworked
-        # in future release.
-        def prepend_ontology(segm):
-            """Convert timestamps to a pandas date/time object."""
-            return f'{CPC.CP_META}{segm}'
-        # Stored as seconds since midnight.
-        time_formats = list(map(prepend_ontology, ['iso8601timeOfDay']))
-        # Stored as days since epoch.
-        date_formats = list(map(prepend_ontology, ['iso8601date', 'etcDate']))
-        # Stored as milliseconds since epoch.
-        datetime_formats = list(map(prepend_ontology, ['iso8601dateTime',
-                                                       'isoLikeLocalDateTime',
-                                                       'etcLocalDateTime']))
-        # Stored as integer.
-        integer_format = list(map(prepend_ontology, ['int32']))
-        def is_time(value_format): return value_format in time_formats
-        def is_date(value_format): return value_format in date_formats
-        def is_datetime(value_format): return value_format in datetime_formats
-        def is_int(value_format): return value_format in integer_format
         fmt = self.variables.sort_values('name')['format'].tolist()
-        rows = int(self.meta['specificInfo']['nRows'])
-        try:
-            for idx, col in enumerate(self._colSelected):
-                lst = list(data[idx*rows:(idx+1)*rows])
-                if self._colSchema[col] == 'CHAR':
-                    # Convert UTF-16, which is often used in "Flag"
-                    # columns.
-                    lst = [chr(i) for i in lst]
-                elif is_datetime(fmt[col]):
-                    lst = pd.to_datetime(lst, unit='ms')
-                elif is_date(fmt[col]):
-                    lst = pd.to_datetime(lst, unit='D')
-                elif is_time(fmt[col]):
-                    lst = pd.to_datetime(lst, unit='s')
-                elif is_int(fmt[col]):
-                    # Keep years and other integers as integers.
-                    pass
-                df = pd.concat([df, pd.Series(lst).rename(columns[col])],
-                               axis=1)
-                
-        except Exception as e:
-            raise Exception('_unpackRawData')
-            print(e)
+        return ([columns[c] for c in self._colSelected],
+                [self._colSchema[c] for c in self._colSelected],
+                [fmt[c] for c in self._colSelected])
 
+    def __convert(self, df):
         """
             The ICOS Carbon Portal provides a TIMESTAMP which is
             a unix timestamp in milliseconds [UTC]
@@ -437,16 +640,21 @@ class Dobj():
             # remove the data, so that only time remains
             df['time'] = pd.to_datetime(df.loc[:,'time'],format='%H:%M').dt.time
 
-        
-        # store data in object
-        if self._datapersistent:
-            self._data = df
-        
+
+        # drop the rows outside of the time window
+        if self._rowMask is not None:
+            df = df[self._rowMask].reset_index(drop=True)
+
         return df
 
     # -------------------------------------------------
     def __portalUse(self, service: str = None) -> None:
         """Private function to track data usage."""
+        if self._chunking is not None:
+            # One event for all chunks of iter_chunks().
+            if self._chunking['reported']:
+                return
+            self._chunking['reported'] = True
         counter = {
             'BinaryFileDownload':
                 {
@@ -462,8 +670,8 @@ class Dobj():
                         },
                 }
         }
-        server = 'https://cpauth.icos-cp.eu/logs/portaluse'
-        requests.post(server, json=counter)
+        # Sent in the background, data access does not wait for it.
+        portaluse.report(counter)
         return
 
     # -------------------------------------------------
@@ -3,8 +3,10 @@ Created on Tue May 24 11:56:23 2022
 @author: Claudio
 """
 from warnings import warn
+import json
 import pandas as pd
-import requests as re
+
+from icoscp import metacache
 
 d = 'https://meta.icos-cp.eu/objects/Igzec8qneVWBDV1qFrlvaxJI'
 
@@ -53,17 +55,16 @@ def get(pid, fmt='dict'):
               'iso19115':'/meta.iso.xml'}
     url = pid+urlfmt[fmt]
     
-    meta = re.get(url)
+    # served from the metadata cache, if still valid
+    meta = metacache.get(url)
     
     # if the ressource (pid) is not found, return None
-    if meta.status_code == 404:        
+    if meta is None:        
         return None
     
     if fmt == 'dict':
         # default, return the metadata as dictionary
-        meta = meta.json()
-    else:
-        meta = meta.text        
+        meta = json.loads(meta)
         
     return meta
 
@@ -1,23 +1,59 @@
 # Standard library imports.
-from dataclasses import asdict
-from typing import Optional, Any, TypedDict, TypeAlias, Literal
+import re
+import threading
 import warnings
+from collections.abc import Iterable, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Literal, Optional, TypeAlias, TypedDict
 
 # Related third party imports.
-from icoscp_core.icos import meta, bootstrap
-from icoscp import cpauth
-from icoscp_core.metacore import DataObject, URI, StationTimeSeriesMeta, \
-    Station, Position
-from icoscp_core.queries.dataobjlist import DataObjectLite
+import numpy as np
 import pandas as pd
+from icoscp_core.dataclient import DataClient
+from icoscp_core.icos import bootstrap
+from icoscp_core.metacore import (
+    URI,
+    DataObject,
+    Position,
+    Station,
+    StationTimeSeriesMeta,
+    TimeInterval,
+)
+from icoscp_core.queries.dataobjlist import DataObjectLite
 
 # Local application/library specific imports.
 import icoscp.const as c
-from icoscp.exceptions import UriValueError, FormatValueError, MetaTypeError, \
-    MetaValueError
-
+from icoscp import (
+    cache,
+    cpauth,
+    dtypepolicy,
+    metacache,
+    predicate,
+    tableformat,
+)
+from icoscp.dtypepolicy import DtypePolicy
+from icoscp.exceptions import (
+    FormatValueError,
+    MetaTypeError,
+    MetaValueError,
+    UriValueError,
+)
+from icoscp.rowwindow import check_window, time_window
 
 CitationFormat: TypeAlias = Literal["plain", "bibtex", "ris"]
+DataFormat: TypeAlias = Literal["pandas", "arrow", "polars"]
+
+DATA_FORMATS = ("pandas", "arrow", "polars")
+
+_data_client: DataClient | None = None
+_data_client_lock = threading.Lock()
 
 
 class LicenceDict(TypedDict):
@@ -32,14 +68,73 @@ class Dobj:
         if (not isinstance(digitalObject, str) and
                 not isinstance(digitalObject, DataObjectLite)):
             raise UriValueError
+        # The full metadata is only fetched on first access, see
+        # Dobj.metadata. Properties which a DataObjectLite can answer do
+        # not need it.
+        self._metadata: DataObject | None = None
+        self._lite: DataObjectLite | None = None
         if isinstance(digitalObject, str):
             self.data_obj_uri = \
                 self.standardize_uri(data_obj_uri=digitalObject)
-            self.metadata: DataObject = \
-                meta.get_dobj_meta(dobj=self.data_obj_uri)
         else:
-            self.metadata: DataObject = \
-                meta.get_dobj_meta(dobj=self.data_obj_uri)
+            self.data_obj_uri = digitalObject.uri
+            self._lite = digitalObject
+        # Decoded columns of all rows, kept so that repeated or
+        # overlapping requests only download the missing columns.
+        # Returned data frames share them only where pandas copies on
+        # write, see tableformat.to_pandas.
+        self._columns: dict[str, pd.Series] = {}
+
+    @classmethod
+    def from_many(cls, uris: Iterable[str | DataObjectLite | Any],
+                  max_workers: int = c.DOBJ_MAX_WORKERS) \
+            -> list["Dobj | Exception"]:
+        """
+        Create many Dobj instances, fetching their metadata concurrently.
+
+        Duplicate uris are fetched once and share the same instance. A
+        uri which fails does not abort the others, its exception is
+        returned in its place and a warning summarizes the failures.
+
+        :param uris: Data object uris, PIDs or DataObjectLite instances.
+        :param max_workers: Maximum number of concurrent requests. Keep
+          it below the pool size of icoscp.session to reuse connections.
+        :return: A list aligned with uris, holding either a Dobj or the
+          exception raised while creating it.
+        """
+        items = list(uris)
+        keys: list[Any] = []
+        for index, item in enumerate(items):
+            if isinstance(item, str):
+                keys.append(cls.standardize_uri(data_obj_uri=item))
+            elif isinstance(item, DataObjectLite):
+                keys.append(item.uri)
+            else:
+                keys.append(("invalid", index))
+        first = dict(reversed(list(zip(keys, items))))
+        results: dict[Any, Dobj | Exception] = {}
+
+        def create(item: str | DataObjectLite | Any) -> Dobj:
+            dobj = cls(item)
+            dobj._load_metadata()
+            return dobj
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {key: pool.submit(create, first[key])
+                       for key in dict.fromkeys(keys)}
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    results[key] = e
+        failed = [r for r in results.values() if isinstance(r, Exception)]
+        if failed:
+            warnings.warn(
+                message=(
+                    f"{len(failed)} of {len(results)} data objects could "
+                    f"not be created, the first error was: {failed[0]!r}"),
+                category=RuntimeWarning, stacklevel=2)
+        return [results[key] for key in keys]
 
     @staticmethod
     def standardize_uri(data_obj_uri: str) -> str:
@@ -52,6 +147,17 @@ class Dobj:
             standardized_pid = f"{c.ICOS_LANDING_PAGE_PREFIX}/{data_obj_uri}"
         return standardized_pid
 
+    @property
+    def metadata(self) -> DataObject:
+        """Full metadata of the data object, fetched on first access."""
+        return self._load_metadata()
+
+    def _load_metadata(self) -> DataObject:
+        if self._metadata is None:
+            self._metadata = metacache.get_parsed(self.data_obj_uri,
+                                                  DataObject)
+        return self._metadata
+
     @property
     def id(self) -> str:
         return self.data_obj_uri
@@ -83,6 +189,49 @@ class Dobj:
     def meta(self) -> dict[str, Optional[Any]]:
         return asdict(self.metadata)
 
+    @property
+    def filename(self) -> str:
+        if self._lite is not None:
+            return self._lite.filename
+        return self.metadata.fileName
+
+    @property
+    def size(self) -> int | None:
+        """Size of the data object in bytes."""
+        if self._lite is not None:
+            return self._lite.size_bytes
+        return self.metadata.size
+
+    @property
+    def spec(self) -> str:
+        """URI of the data type (data object specification)."""
+        if self._lite is not None:
+            return self._lite.datatype_uri
+        return self.metadata.specification.self.uri
+
+    @property
+    def time_start(self) -> datetime | None:
+        """Start of the temporal coverage."""
+        if self._lite is not None:
+            return self._lite.time_start
+        interval = self._interval
+        return None if interval is None else _to_datetime(interval.start)
+
+    @property
+    def time_end(self) -> datetime | None:
+        """End of the temporal coverage."""
+        if self._lite is not None:
+            return self._lite.time_end
+        interval = self._interval
+        return None if interval is None else _to_datetime(interval.stop)
+
+    @property
+    def _interval(self) -> TimeInterval | None:
+        spec_info = self.metadata.specificInfo
+        return spec_info.acquisition.interval \
+            if isinstance(spec_info, StationTimeSeriesMeta) \
+            else spec_info.temporal.interval
+
     @property
     def citation(self) -> str | None:
         return self.metadata.references.citationString
@@ -220,20 +369,263 @@ class Dobj:
                        for v in cols]
         })
 
-    def get(self, columns: list[str] | None = None) -> pd.DataFrame:
+    def get(self, columns: list[str] | None = None, *,  # noqa: PLR0913
+            start: Any = None, end: Any = None,
+            offset: int | None = None,
+            length: int | None = None,
+            format: DataFormat = "pandas",  # noqa: A002
+            dtypes: DtypePolicy | None = None,
+            filters: list[predicate.Filter] | None = None) -> Any:
         """
         Get data for the selected columns, or all columns.
 
+        Only the requested rows are downloaded, either a time window
+        (start, end) or a row window (offset, length). The time window
+        is found in the TIMESTAMP column, by binary search if it is
+        sorted.
+
+        :param columns: Column names, None for all columns.
+        :param start: First time to include, anything understood by
+          pandas.Timestamp.
+        :param end: First time to exclude.
+        :param offset: Number of heading rows to skip.
+        :param length: Number of rows to return.
+        :param format: "pandas", "arrow" for a pyarrow.Table or
+          "polars" for a polars.DataFrame. The Arrow and Polars tables
+          are built over the decoded buffers, see icoscp.tableformat.
+        :param dtypes: Column types of a pandas dataframe, like
+          icoscp.dtypepolicy.LEAN, None for the default types. The
+          number of bytes saved is reported in df.attrs['bytes_saved'].
+        :param filters: (column, operator, value) tuples, like
+          [('Flag', 'in', ['O', 'U'])], see icoscp.predicate. Only the
+          rows matching all the filters are returned. The filters are
+          evaluated on the decoded arrays, before the data frame is
+          built.
         :return: A pandas dataframe generated using a standardized
-         plain CSV serialization of a tabular data object.
+         plain CSV serialization of a tabular data object, or a table
+         of the requested format.
+        :raise ValueError: A ValueError is raised when both a time and
+         a row window are provided, for an invalid row window, for an
+         unsupported format or for a malformed filter.
         """
 
-        data_client = bootstrap.fromAuthProvider(cpauth)
-        df = pd.DataFrame(data_client.get_columns_as_arrays(dobj=self.metadata,
-                                                     columns=columns))
-        df = df.reindex(sorted(df.columns), axis=1)  # type: ignore
+        if format not in DATA_FORMATS:
+            msg = (f"Unsupported data format: {format}, use one of "
+                   f"{', '.join(DATA_FORMATS)}.")
+            raise ValueError(msg)
+        if dtypes is not None and format != "pandas":
+            msg = "The dtypes policy only applies to the pandas format."
+            raise ValueError(msg)
+        filters = predicate.validate(filters or [])
+
+        data_client = get_data_client()
+        window, mask = self._window(data_client, start, end, offset, length)
+        output = self._names(columns)
+        extra = []
+        if filters and columns is not None:
+            # Columns which are only downloaded to be filtered on.
+            extra = [n for n in predicate.columns(filters)
+                     if n not in (output or columns)]
+            columns = [*columns, *extra]
+        arrays, window = self._fetch(data_client, columns, window,
+                                     keep=not filters)
+        if filters:
+            arrays = self._select(arrays, window, mask)
+            keep = predicate.mask(arrays, filters)
+            arrays = {n: v[keep] for n, v in arrays.items()
+                      if n not in extra and (output is None or n in output)}
+            window, mask = None, None
+        if format != "pandas":
+            return self._table(arrays, window, mask, format)
+        df = self._frame(arrays, window, mask)
+        if dtypes is not None:
+            df = dtypepolicy.apply(df, dtypes, self._value_formats())
+        return df
+
+    def _window(self, data_client: DataClient, start: Any, end: Any,
+                offset: int | None, length: int | None
+                ) -> tuple[tuple[int, int] | None, Any]:
+        """
+        The row window of Dobj.get(), and the mask of the matching rows
+        within the window for an unsorted TIMESTAMP column.
+        """
+        mask = None
+        if start is not None or end is not None:
+            if offset is not None or length is not None:
+                msg = "Provide either start/end or offset/length, not both."
+                raise ValueError(msg)
+            if "TIMESTAMP" not in self._columns:
+                self._keep(self._arrays(data_client, ["TIMESTAMP"], None))
+            timestamps = self._columns["TIMESTAMP"].to_numpy()
+            offset, length, mask = time_window(timestamps, start, end)
+        if offset is None and length is None:
+            return None, mask
+        n_rows = self.metadata.specificInfo.nRows or 0
+        return check_window(offset, length, n_rows), mask
+
+    def _fetch(self, data_client: DataClient, columns: list[str] | None,
+               window: tuple[int, int] | None, *, keep: bool
+               ) -> tuple[dict[str, Any], tuple[int, int] | None]:
+        """
+        The arrays of the columns, served from the kept columns when
+        possible. Whole columns are kept in the object if keep is True.
+        The returned window is None if only its rows were downloaded.
+        """
+        names = self._names(columns)
+        if names is None:
+            return self._arrays(data_client, columns, window), None
+        if window is None and keep:
+            missing = [n for n in names if n not in self._columns]
+            if len(missing) == len(names):
+                self._keep(self._arrays(data_client, columns, None))
+            elif missing:
+                self._keep(self._arrays(data_client, missing, None))
+            return {n: self._columns[n] for n in names
+                    if n in self._columns}, None
+        if all(n in self._columns for n in names):
+            return {n: self._columns[n] for n in names}, window
+        return self._arrays(data_client, columns, window), None
+
+    def _frame(self, arrays: dict[str, Any], window: tuple[int, int] | None,
+               mask: Any) -> pd.DataFrame:
+        """
+        The data frame of the rows of a window and a mask. Only the
+        rows of the window are taken from kept columns, and downloaded
+        arrays are not copied, see tableformat.to_pandas.
+        """
+        shared = {n for n, v in arrays.items() if v is self._columns.get(n)}
+        if window is not None:
+            first, count = window
+            arrays = {n: v.iloc[first:first + count] if n in shared
+                      else v[first:first + count] for n, v in arrays.items()}
+        # One block per column in sorted order.
+        df = tableformat.to_pandas({n: arrays[n] for n in sorted(arrays)},
+                                   shared)
+        if mask is not None:
+            df = df[mask]
+        # Set in place, reset_index copies before pandas 3.
+        df.index = pd.RangeIndex(len(df))
         return df
 
+    @staticmethod
+    def _select(arrays: dict[str, Any], window: tuple[int, int] | None,
+                mask: Any) -> dict[str, np.ndarray]:
+        """The rows of a window and a mask, as numpy arrays."""
+        selected = {}
+        for name in sorted(arrays):
+            values = np.asarray(arrays[name])
+            if window is not None:
+                values = values[window[0]:window[0] + window[1]]
+            if mask is not None:
+                values = values[mask]
+            selected[name] = values
+        return selected
+
+    @classmethod
+    def _table(cls, arrays: dict[str, Any], window: tuple[int, int] | None,
+               mask: Any, data_format: DataFormat) -> Any:
+        selected = cls._select(arrays, window, mask)
+        if data_format == "arrow":
+            return tableformat.to_arrow(selected)
+        return tableformat.to_polars(selected)
+
+    def _keep(self, arrays: dict[str, Any]) -> None:
+        for name, values in arrays.items():
+            self._columns[name] = pd.Series(values, name=name, copy=False)
+
+    def _value_formats(self) -> dict[str, str | None]:
+        spec_info = self.metadata.specificInfo
+        if not isinstance(spec_info, StationTimeSeriesMeta):
+            return {}
+        return {col.label: col.valueFormat for col in spec_info.columns or []}
+
+    def _names(self, columns: list[str] | None) -> list[str] | None:
+        """
+        Names of the columns returned for a request: the requested
+        columns, or all columns with a value format, and their quality
+        flag columns. None if the metadata has no column information.
+        """
+        spec_info = self.metadata.specificInfo
+        cols = spec_info.columns \
+            if isinstance(spec_info, StationTimeSeriesMeta) else None
+        if not cols:
+            return None
+        if columns is None:
+            return [col.label for col in cols if col.valueFormat is not None]
+        flagged = {uri: col.label for col in cols if col.isFlagFor
+                   for uri in col.isFlagFor}
+        flags = {col.label: flagged[col.model.uri] for col in cols
+                 if col.model.uri in flagged}
+        names = list(dict.fromkeys(columns))
+        names += [flags[n] for n in columns
+                  if n in flags and flags[n] not in names]
+        return names
+
+    def _arrays(self, data_client: Any, columns: list[str] | None,
+                window: tuple[int, int] | None) -> dict[str, Any]:
+        """Columns from the disk cache if enabled, else downloaded."""
+        disk = cache.active()
+        if disk is not None and self.next:
+            # Superseded by a new version, free the space.
+            disk.invalidate(self.data_obj_uri)
+            disk = None
+        if disk is None:
+            return self._download(data_client, columns, window)
+        key = ("core", None if columns is None else tuple(sorted(columns)),
+               window)
+        arrays = disk.load(self.data_obj_uri, key)
+        if arrays is None:
+            arrays = self._download(data_client, columns, window)
+            disk.store(self.data_obj_uri, key, arrays)
+        return arrays
+
+    def _download(self, data_client: Any, columns: list[str] | None,
+                  window: tuple[int, int] | None) -> dict[str, Any]:
+        if window is None:
+            return data_client.get_columns_as_arrays(dobj=self.metadata,
+                                                     columns=columns)
+        offset, length = window
+        n_rows = self.metadata.specificInfo.nRows or 0
+        # The data service reads a zero length as "all rows".
+        arrays = data_client.get_columns_as_arrays(
+            dobj=self.metadata, columns=columns,
+            offset=offset if length else 0,
+            length=length if length or not n_rows else 1)
+        return {k: v[:length] for k, v in arrays.items()}
+
+    def iter_chunks(self, columns: list[str] | None = None,
+                    rows_per_chunk: int = c.DOBJ_CHUNK_ROWS,
+                    format: DataFormat = "pandas",  # noqa: A002
+                    dtypes: DtypePolicy | None = None,
+                    filters: list[predicate.Filter] | None = None) \
+            -> Iterator[Any]:
+        """
+        Iterate over the data in chunks of rows.
+
+        Each chunk is a row window of Dobj.get(), which only downloads
+        these rows, so that the whole data object is never held in
+        memory.
+
+        :param columns: Column names, None for all columns.
+        :param rows_per_chunk: Maximum number of rows of a chunk.
+        :param format: See Dobj.get.
+        :param dtypes: See Dobj.get.
+        :param filters: See Dobj.get.
+        :return: An iterator of data frames, or tables of the requested
+          format.
+        :raise ValueError: A ValueError is raised when rows_per_chunk is
+          not positive.
+        """
+        if rows_per_chunk < 1:
+            msg = (f"The value provided for the 'rows_per_chunk' parameter "
+                   f"({rows_per_chunk}) must be positive")
+            raise ValueError(msg)
+        n_rows = self.metadata.specificInfo.nRows or 0
+        for offset in range(0, n_rows, rows_per_chunk):
+            yield self.get(columns=columns, offset=offset,
+                           length=rows_per_chunk, format=format,
+                           dtypes=dtypes, filters=filters)
+
     def getColumns(self, columns: list[str] | None = None) -> pd.DataFrame:
         """Same as Dobj.get()"""
         warnings.warn(
@@ -242,3 +634,71 @@ class Dobj:
                 "deprecated. Please, use 'Dobj.get()' instead."),
             category=FutureWarning)
         return self.get(columns=columns)
+
+
+def _to_datetime(instant: str) -> datetime:
+    # fromisoformat only accepts a "Z" suffix from python 3.11.
+    return datetime.fromisoformat(re.sub(r"Z$", "+00:00", instant))
+
+
+def get_data_client() -> DataClient:
+    """The data client shared by all Dobj instances."""
+    global _data_client  # noqa: PLW0603
+    with _data_client_lock:
+        if _data_client is None:
+            _data_client = bootstrap.fromAuthProvider(cpauth)
+        return _data_client
+
+
+def batch_get(dobjs: Iterable[Dobj | str | DataObjectLite],  # noqa: PLR0913
+              columns: list[str] | None = None, *,
+              start: Any = None, end: Any = None,
+              max_workers: int = c.DOBJ_MAX_WORKERS,
+              format: DataFormat = "pandas",  # noqa: A002
+              filters: list[predicate.Filter] | None = None) \
+        -> Iterator[tuple[Dobj, Any]]:
+    """
+    Get the data of many data objects, downloading concurrently.
+
+    The (Dobj, DataFrame) pairs are yielded as the downloads complete,
+    not in input order. At most max_workers downloads are in flight, so
+    memory use stays bounded however many objects are requested.
+
+    :param dobjs: Dobj instances, data object uris or DataObjectLite
+      instances.
+    :param columns: Column names, None for all columns.
+    :param start: See Dobj.get.
+    :param end: See Dobj.get.
+    :param max_workers: Maximum number of concurrent downloads.
+    :param format: See Dobj.get.
+    :param filters: See Dobj.get.
+    :return: An iterator of (Dobj, DataFrame) pairs.
+    :raise Exception: The first error of a download is raised, and the
+      downloads that did not start yet are cancelled.
+    """
+
+    def fetch(item: Dobj | str | DataObjectLite) -> tuple[Dobj, Any]:
+        dobj = item if isinstance(item, Dobj) else Dobj(item)
+        return dobj, dobj.get(columns=columns, start=start, end=end,
+                              format=format, filters=filters)
+
+    items = iter(dobjs)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: set[Future[tuple[Dobj, Any]]] = set()
+        try:
+            for item in items:
+                pending.add(pool.submit(fetch, item))
+                if len(pending) == max_workers:
+                    break
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    # Keep the pool busy while the caller handles result.
+                    for item in items:
+                        pending.add(pool.submit(fetch, item))
+                        break
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,114 @@
+"""
+Memory-lean column types for the data frames of data objects.
+
+By default quality flags are strings, floating point columns are
+float64 and time columns are datetime64. A DtypePolicy passed to
+Dobj.get() changes these types, and LEAN changes all of them:
+
+>>> from icoscp.dtypepolicy import DtypePolicy
+>>> policy = DtypePolicy(flags='category', float32=True)
+>>> df = dobj.get(dtypes=policy)  # doctest: +SKIP
+>>> df.attrs['bytes_saved']  # doctest: +SKIP
+
+The columns are converted once the data frame is built, so a policy
+lowers the memory held by the returned data frame, not the peak memory
+of Dobj.get().
+"""
+
+# Standard library imports.
+from dataclasses import dataclass
+from typing import Literal
+
+# Related third party imports.
+import numpy as np
+import pandas as pd
+
+FLAG_TYPES = ("str", "category", "codes")
+# Value format of single character columns, like quality flags.
+CHAR_FORMAT = "/bmpChar"
+
+
+@dataclass(frozen=True)
+class DtypePolicy:
+    """
+    :param flags: Type of single character columns, like quality flags:
+      "str" (default), "category", or "codes" for their uint16
+      character codes, as stored in the binary files, or nullable
+      UInt16 codes if flags are missing. Other string columns are not
+      changed.
+    :param float32: Return float32 columns for variables stored as 32
+      bit floats, instead of float64.
+    :param raw_timestamps: Return time columns, like TIMESTAMP, as int64
+      milliseconds since epoch instead of datetime64, or nullable Int64
+      milliseconds if times are missing.
+    """
+    flags: Literal["str", "category", "codes"] = "str"
+    float32: bool = False
+    raw_timestamps: bool = False
+
+    def __post_init__(self) -> None:
+        if self.flags not in FLAG_TYPES:
+            msg = (f"Unsupported flag type: {self.flags}, use one of "
+                   f"{', '.join(FLAG_TYPES)}.")
+            raise ValueError(msg)
+
+
+LEAN = DtypePolicy(flags="category", float32=True, raw_timestamps=True)
+
+
+def apply(df: pd.DataFrame, policy: DtypePolicy,
+          formats: dict[str, str | None]) -> pd.DataFrame:
+    """
+    Convert the columns of a data frame according to a policy.
+
+    The number of bytes saved, compared to the default types, is
+    reported in df.attrs['bytes_saved'].
+
+    :param df: Data frame with the default column types.
+    :param policy: The column types to use.
+    :param formats: Value format uri of each column.
+    :return: The converted data frame, other columns are not copied.
+    """
+    converted = {}
+    saved = 0
+    for name in df.columns:
+        series = df[name]
+        values = _convert(series, policy, formats.get(name))
+        if values is None:
+            continue
+        converted[name] = values
+        saved += series.memory_usage(index=False, deep=True) - \
+            values.memory_usage(index=False, deep=True)
+    if converted:
+        df = df.assign(**converted)
+    df.attrs["bytes_saved"] = int(saved)
+    return df
+
+
+def _convert(series: pd.Series, policy: DtypePolicy,
+             value_format: str | None) -> pd.Series | None:
+    """The converted column, None if the column is not changed."""
+    dtype = series.dtype
+    if (value_format or "").endswith(CHAR_FORMAT) and policy.flags != "str":
+        if policy.flags == "category":
+            return series.astype("category")
+        codes = series.to_numpy(dtype="U1", na_value="\0").view(np.uint32)
+        return _integers(series, codes.astype(np.uint16))
+    if dtype.kind == "M" and policy.raw_timestamps:
+        millis = series.to_numpy().astype("datetime64[ms]").view(np.int64)
+        return _integers(series, millis)
+    if dtype == np.float64 and policy.float32 and \
+            (value_format or "").endswith("/float32"):
+        return series.astype(np.float32)
+    return None
+
+
+def _integers(series: pd.Series, values: np.ndarray) -> pd.Series:
+    """
+    A series of integer values, of the nullable integer type if values
+    of the series are missing.
+    """
+    missing = series.isna().to_numpy()
+    if missing.any():
+        values = pd.arrays.IntegerArray(values, missing)
+    return pd.Series(values, index=series.index, name=series.name)
@@ -0,0 +1,211 @@
+"""
+Cache of data object metadata.
+
+Metadata documents are kept in a bounded in-process LRU and, when the
+disk cache is enabled (see icoscp.cache), in its 'meta' folder as well.
+A cached document is served as is for META_CACHE_MAX_AGE_SEC seconds,
+afterwards it is revalidated with a conditional request (ETag or
+Last-Modified), which only downloads the document again if it changed.
+Documents of objects with a next version are frozen and never
+revalidated.
+"""
+
+# Standard library imports.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from http import HTTPStatus
+from typing import Any, TypeVar, cast
+
+# Related third party imports.
+from icoscp_core.metacore import parse_cp_json
+
+# Local application/library specific imports.
+import icoscp.const as c
+from icoscp import cache, session
+
+T = TypeVar("T")
+
+
+@dataclass
+class Entry:
+    text: str
+    etag: str | None = None
+    last_modified: str | None = None
+    checked: float = 0.0
+    frozen: bool = False
+    # Parsed documents per dataclass, only kept in memory.
+    parsed: dict[Any, Any] = field(default_factory=dict)
+
+    def fresh(self, max_age: float) -> bool:
+        return self.frozen or time.time() - self.checked < max_age
+
+
+class MetaCache:
+    def __init__(self, max_entries: int = c.META_CACHE_ENTRIES,
+                 max_age: float = c.META_CACHE_MAX_AGE_SEC) -> None:
+        """
+        :param max_entries: Number of documents kept in memory.
+        :param max_age: Seconds a document is served without
+          revalidation.
+        """
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str | None], Entry] = \
+            OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str, accept: str | None = None) -> str | None:
+        """
+        Text of the document at url, None if it does not exist.
+
+        :raise requests.HTTPError: For other unsuccessful responses.
+        """
+        entry = self.entry(url, accept)
+        return None if entry is None else entry.text
+
+    def get_parsed(self, url: str, data_class: type[T]) -> T:
+        """
+        JSON document at url, parsed into an icoscp_core dataclass.
+
+        :raise requests.HTTPError: If the document can not be fetched.
+        """
+        # Never None, unsuccessful responses raise in strict mode.
+        entry = cast(Entry, self.entry(url, "application/json", strict=True))
+        if data_class not in entry.parsed:
+            entry.parsed[data_class] = parse_cp_json(entry.text, data_class)
+        return entry.parsed[data_class]
+
+    def entry(self, url: str, accept: str | None = None, *,
+              strict: bool = False) -> Entry | None:
+        key = (url, accept)
+        entry = self._memory(key)
+        if entry is None:
+            entry = self._load(key)
+        if entry is not None and entry.fresh(self.max_age):
+            with self._lock:
+                self.hits += 1
+            return entry
+        with self._lock:
+            self.misses += 1
+        headers = {} if accept is None else {"Accept": accept}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        response = session.get(url, headers=headers)
+        if response.status_code == HTTPStatus.NOT_MODIFIED and \
+                entry is not None:
+            entry.checked = time.time()
+        elif response.status_code == HTTPStatus.NOT_FOUND and not strict:
+            self._forget(key)
+            return None
+        else:
+            response.raise_for_status()
+            entry = Entry(text=response.text,
+                          etag=response.headers.get("ETag"),
+                          last_modified=response.headers.get("Last-Modified"),
+                          checked=time.time(),
+                          frozen=_has_next_version(response.text))
+        self._remember(key, entry)
+        self._store(key, entry)
+        return entry
+
+    def clear(self) -> None:
+        """Empty the in-process cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def _memory(self, key: tuple[str, str | None]) -> Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _remember(self, key: tuple[str, str | None], entry: Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _forget(self, key: tuple[str, str | None]) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        path = _path(key)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def _load(self, key: tuple[str, str | None]) -> Entry | None:
+        path = _path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = Entry(**json.load(f))
+            # Keeps the least recently used order of the disk cache.
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except (OSError, ValueError, TypeError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _store(self, key: tuple[str, str | None], entry: Entry) -> None:
+        path = _path(key)
+        if path is None:
+            return
+        data = asdict(entry)
+        del data["parsed"]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _path(key: tuple[str, str | None]) -> str | None:
+    """Disk path of a document, None if the disk cache is disabled."""
+    disk = cache.active()
+    if disk is None:
+        return None
+    digest = hashlib.sha256(repr(key).encode()).hexdigest()
+    return os.path.join(disk.folder, "meta", digest + ".json")
+
+
+def _has_next_version(text: str) -> bool:
+    try:
+        document = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(document, dict) and bool(document.get("nextVersion"))
+
+
+_metacache = MetaCache()
+
+
+def get(url: str, accept: str | None = None) -> str | None:
+    """See MetaCache.get."""
+    return _metacache.get(url, accept)
+
+
+def get_parsed(url: str, data_class: type[T]) -> T:
+    """See MetaCache.get_parsed."""
+    return _metacache.get_parsed(url, data_class)
+
+
+def clear() -> None:
+    """Empty the in-process metadata cache."""
+    _metacache.clear()
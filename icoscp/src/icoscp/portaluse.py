@@ -0,0 +1,110 @@
+"""
+Report data usage to the ICOS Carbon Portal without blocking data access.
+
+Events are put on a bounded queue and posted one by one by a background
+thread, over the shared keep-alive session, since the endpoint takes one
+event per request. Pending events are flushed at interpreter exit. When
+the queue is full, new events are dropped rather than delaying the
+caller.
+"""
+
+# Standard library imports.
+import atexit
+import logging
+import queue
+import threading
+from typing import Any
+
+# Related third party imports.
+import requests
+
+# Local application/library specific imports.
+import icoscp.const as c
+from icoscp import session
+
+logger = logging.getLogger(__name__)
+
+
+class Dispatcher:
+    def __init__(self, url: str = c.PORTAL_USE,
+                 maxsize: int = c.PORTAL_USE_QUEUE_SIZE,
+                 timeout: float = c.PORTAL_USE_TIMEOUT_SEC) -> None:
+        """
+        :param url: Endpoint the events are posted to.
+        :param maxsize: Maximum number of queued events.
+        :param timeout: Timeout in seconds of each post.
+        """
+        self.url = url
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, event: dict[str, Any]) -> bool:
+        """
+        Queue an event without waiting for it to be sent.
+
+        :return: False if the queue is full and the event was dropped.
+        """
+        self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until all queued events have been sent.
+
+        :param timeout: Maximum time to wait in seconds, None to wait
+          until done.
+        :return: True if the queue was emptied.
+        """
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: not self._queue.unfinished_tasks, timeout)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._thread is None:
+                atexit.register(self.flush, c.PORTAL_USE_FLUSH_TIMEOUT_SEC)
+            self._thread = threading.Thread(target=self._run,
+                                            name="icoscp-portaluse",
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            event = self._queue.get()
+            try:
+                self._send(event)
+            finally:
+                self._queue.task_done()
+
+    def _send(self, event: dict[str, Any]) -> None:
+        try:
+            session.post(self.url, json=event, timeout=self.timeout)
+        except requests.RequestException as err:
+            logger.warning("Reporting data usage failed: %s", err)
+
+
+_dispatcher = Dispatcher()
+
+
+def report(event: dict[str, Any]) -> bool:
+    """
+    Report a data usage event in the background.
+
+    :return: False if the event was dropped.
+    """
+    return _dispatcher.submit(event)
+
+
+def flush(timeout: float | None = None) -> bool:
+    """Wait until all reported events have been sent."""
+    return _dispatcher.flush(timeout)
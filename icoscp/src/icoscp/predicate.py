@@ -0,0 +1,110 @@
+"""
+Row filters evaluated on decoded columns.
+
+A filter is a (column, operator, value) tuple, and a list of filters
+selects the rows matching all of them:
+
+>>> filters = [('Flag', 'in', ['O', 'U']), ('co2', '>', 400),
+...            ('TIMESTAMP', '>=', '2023-01-01')]
+>>> df = dobj.get(filters=filters)  # doctest: +SKIP
+
+The operators are ==, !=, <, <=, >, >=, 'in' and 'not in'. Values
+compared to time columns can be anything understood by pandas.Timestamp,
+time zone aware values are converted to UTC.
+"""
+
+# Standard library imports.
+from collections.abc import Callable, Iterable
+from typing import Any
+
+# Related third party imports.
+import numpy as np
+import pandas as pd
+
+# (column, operator, value)
+Filter = tuple[str, str, Any]
+FILTER_SIZE = 3
+
+COMPARISONS: dict[str, Callable[[Any, Any], np.ndarray]] = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+MEMBERSHIPS = ("in", "not in")
+
+
+def validate(filters: Iterable[Filter]) -> list[Filter]:
+    """
+    Check the filters.
+
+    :param filters: (column, operator, value) tuples.
+    :return: The filters as a list.
+    :raise ValueError: A ValueError is raised for a malformed filter or
+      an unknown operator.
+    """
+    checked = []
+    for f in filters:
+        if not isinstance(f, (tuple, list)) or len(f) != FILTER_SIZE:
+            msg = (f"A filter must be a (column, operator, value) tuple, "
+                   f"not {f!r}")
+            raise ValueError(msg)
+        column, operator, value = f
+        if operator not in COMPARISONS and operator not in MEMBERSHIPS:
+            msg = (f"Unsupported filter operator: {operator}, use one of "
+                   f"{', '.join([*COMPARISONS, *MEMBERSHIPS])}.")
+            raise ValueError(msg)
+        if operator in MEMBERSHIPS and isinstance(value, (str, bytes)):
+            msg = (f"The value of an '{operator}' filter must be a list of "
+                   f"values, not {value!r}")
+            raise ValueError(msg)
+        checked.append((column, operator, value))
+    return checked
+
+
+def columns(filters: list[Filter]) -> list[str]:
+    """Names of the columns the filters refer to, without duplicates."""
+    return list(dict.fromkeys(column for column, _, _ in filters))
+
+
+def mask(arrays: dict[str, np.ndarray], filters: list[Filter]) -> np.ndarray:
+    """
+    Boolean mask of the rows matching all the filters.
+
+    :param arrays: Decoded columns by name, including all the columns
+      the filters refer to.
+    :param filters: Validated filters.
+    :raise KeyError: A KeyError is raised if a filtered column is not
+      in arrays.
+    """
+    n_rows = len(next(iter(arrays.values()))) if arrays else 0
+    keep = np.ones(n_rows, dtype=bool)
+    for column, operator, value in filters:
+        if column not in arrays:
+            msg = f"Cannot filter on unknown column {column!r}"
+            raise KeyError(msg)
+        values = np.asarray(arrays[column])
+        if operator in MEMBERSHIPS:
+            matches = np.isin(values, [_operand(v, values.dtype)
+                                       for v in value])
+            if operator == "not in":
+                matches = ~matches
+        else:
+            matches = COMPARISONS[operator](values,
+                                            _operand(value, values.dtype))
+        keep &= matches
+    return keep
+
+
+def _operand(value: Any, dtype: np.dtype) -> Any:
+    """A value comparable to the values of a column."""
+    if dtype.kind == "M":
+        stamp = pd.Timestamp(value)
+        if stamp.tzinfo is not None:
+            stamp = stamp.tz_convert("UTC").tz_localize(None)
+        return np.datetime64(stamp.value, "ns").astype(dtype)
+    if dtype.kind in "UO":
+        return str(value)
+    return value
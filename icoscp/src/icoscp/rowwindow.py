@@ -0,0 +1,92 @@
+# Standard library imports.
+from typing import Any
+
+# Related third party imports.
+import numpy as np
+import pandas as pd
+
+
+def check_window(offset: int | None, length: int | None,
+                 n_rows: int) -> tuple[int, int]:
+    """
+    Validate a row window against the number of rows of a data object.
+
+    :param offset: Number of heading rows to skip, None for 0.
+    :param length: Number of rows to return, None for all remaining
+        rows. Windows reaching past the last row are shortened.
+    :param n_rows: Number of rows in the data object.
+    :return: The (offset, length) of the window.
+    :raise ValueError: A ValueError is raised for a negative length or
+        an offset outside the data object.
+    """
+    offset = 0 if offset is None else int(offset)
+    if not 0 <= offset <= n_rows:
+        msg = (f"The value provided for the 'offset' parameter ({offset}) "
+               f"must be between 0 and the number of rows ({n_rows})")
+        raise ValueError(msg)
+    if length is None:
+        length = n_rows - offset
+    elif int(length) < 0:
+        msg = (f"The value provided for the 'length' parameter ({length}) "
+               f"must not be negative")
+        raise ValueError(msg)
+    return offset, min(int(length), n_rows - offset)
+
+
+def time_window(timestamps: np.ndarray, start: Any = None,
+                end: Any = None) -> tuple[int, int, np.ndarray | None]:
+    """
+    Find the rows with start <= timestamp < end.
+
+    For sorted timestamps the window is found by binary search. For
+    unsorted timestamps the window spans all the matching rows, and a
+    boolean mask selecting the matching rows within the window is
+    returned as well.
+
+    :param timestamps: TIMESTAMP column, either datetime64 values or
+        milliseconds since epoch, as stored in the binary files.
+    :param start: First time to include, anything understood by
+        pandas.Timestamp, None for no lower bound. Time zone aware
+        values are converted to UTC.
+    :param end: First time to exclude, None for no upper bound.
+    :return: The (offset, length, mask) of the window, mask being None
+        when all the rows of the window match.
+    """
+    values = _comparable(timestamps)
+    lower = _bound(start, values.dtype)
+    upper = _bound(end, values.dtype)
+    if bool(np.all(values[1:] >= values[:-1])):
+        first = 0 if lower is None else \
+            int(np.searchsorted(values, lower, side="left"))
+        last = values.size if upper is None else \
+            int(np.searchsorted(values, upper, side="left"))
+        return first, max(last - first, 0), None
+    matches = np.ones(values.size, dtype=bool)
+    if lower is not None:
+        matches &= values >= lower
+    if upper is not None:
+        matches &= values < upper
+    rows = np.flatnonzero(matches)
+    if not rows.size:
+        return 0, 0, None
+    first, last = int(rows[0]), int(rows[-1]) + 1
+    return first, last - first, matches[first:last]
+
+
+def _comparable(timestamps: np.ndarray) -> np.ndarray:
+    values = np.asarray(timestamps)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[ns]")
+    return values.astype(np.float64, copy=False)
+
+
+def _bound(value: Any, kind: np.dtype) -> Any:
+    if value is None:
+        return None
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_convert("UTC").tz_localize(None)
+    if kind.kind == "M":
+        return np.datetime64(stamp.value, "ns")
+    # Milliseconds since epoch.
+    return stamp.value / 1e6
@@ -0,0 +1,149 @@
+"""
+Shared HTTP session of the icoscp modules.
+
+All requests to the ICOS Carbon Portal go through one requests.Session,
+so that TCP and TLS connections are kept alive and reused across calls
+and threads. The connection pools and the default timeout can be
+configured, for example before a loop over many data objects:
+
+>>> from icoscp import session
+>>> session.configure(timeout=(5, 600), pool_maxsize=20,
+...                   host_pool_sizes={'data.icos-cp.eu': 32})  # doctest: +SKIP
+"""
+
+# Standard library imports.
+import threading
+from typing import Any
+
+# Related third party imports.
+import requests
+from requests.adapters import HTTPAdapter
+
+# Local application/library specific imports.
+import icoscp.const as c
+
+Timeout = float | tuple[float, float] | None
+
+
+class SessionProvider:
+    def __init__(self, timeout: Timeout = c.HTTP_SESSION_TIMEOUT_SEC,
+                 pool_connections: int = c.HTTP_POOL_CONNECTIONS,
+                 pool_maxsize: int = c.HTTP_POOL_MAXSIZE,
+                 host_pool_sizes: dict[str, int] | None = None) -> None:
+        """
+        :param timeout: Default timeout in seconds of a request, either
+          one value or a (connect, read) tuple.
+        :param pool_connections: Number of hosts to keep pools for.
+        :param pool_maxsize: Maximum number of kept-alive connections
+          per host.
+        :param host_pool_sizes: Maximum number of kept-alive connections
+          for specific hosts, like {'data.icos-cp.eu': 32}.
+        """
+        self.timeout = timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.host_pool_sizes = dict(host_pool_sizes or {})
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+
+    def configure(self, *, timeout: Timeout | bool = False,
+                  pool_connections: int | None = None,
+                  pool_maxsize: int | None = None,
+                  host_pool_sizes: dict[str, int] | None = None) -> None:
+        """
+        Change the settings of the session. Arguments which are not
+        provided are left unchanged; timeout=None disables the default
+        timeout. Open connections are closed.
+        """
+        with self._lock:
+            if timeout is not False:
+                self.timeout = timeout
+            if pool_connections is not None:
+                self.pool_connections = pool_connections
+            if pool_maxsize is not None:
+                self.pool_maxsize = pool_maxsize
+            if host_pool_sizes is not None:
+                self.host_pool_sizes.update(host_pool_sizes)
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def set_host_pool_size(self, host: str, pool_maxsize: int) -> None:
+        """
+        Change the maximum number of kept-alive connections to one host.
+        Unlike configure(), the session is kept; requests in flight to
+        the host finish over the previous pool.
+        """
+        with self._lock:
+            self.host_pool_sizes[host] = pool_maxsize
+            if self._session is not None:
+                _mount_host(self._session, host, pool_maxsize)
+
+    @property
+    def session(self) -> requests.Session:
+        """The shared session, created on first use."""
+        with self._lock:
+            if self._session is None:
+                self._session = self._new_session()
+            return self._session
+
+    def request(self, method: str, url: str,
+                **kwargs: Any) -> requests.Response:
+        """Same as requests.request, with the default timeout."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        for host, size in self.host_pool_sizes.items():
+            _mount_host(session, host, size)
+        return session
+
+
+def _mount_host(session: requests.Session, host: str,
+                pool_maxsize: int) -> None:
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+    session.mount(f"https://{host}/", adapter)
+    session.mount(f"http://{host}/", adapter)
+
+
+_provider = SessionProvider()
+
+
+def configure(*, timeout: Timeout | bool = False,
+              pool_connections: int | None = None,
+              pool_maxsize: int | None = None,
+              host_pool_sizes: dict[str, int] | None = None) -> None:
+    """See SessionProvider.configure."""
+    _provider.configure(timeout=timeout, pool_connections=pool_connections,
+                        pool_maxsize=pool_maxsize,
+                        host_pool_sizes=host_pool_sizes)
+
+
+def set_host_pool_size(host: str, pool_maxsize: int) -> None:
+    """See SessionProvider.set_host_pool_size."""
+    _provider.set_host_pool_size(host, pool_maxsize)
+
+
+def get_session() -> requests.Session:
+    """The shared requests.Session."""
+    return _provider.session
+
+
+def request(method: str, url: str, **kwargs: Any) -> requests.Response:
+    """Send a request over the shared session."""
+    return _provider.request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    """Send a GET request over the shared session."""
+    return _provider.request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    """Send a POST request over the shared session."""
+    return _provider.request("POST", url, **kwargs)
@@ -0,0 +1,78 @@
+"""
+Typed columns of SPARQL JSON results.
+
+Each binding of a SPARQL JSON result carries the type of its value: an
+uri, or a literal with an optional XML schema datatype. Columns whose
+values all have the same datatype are converted once, vectorized, to
+the matching pandas type; uri columns with repeated values become
+categories. Other columns are kept as strings.
+"""
+
+# Standard library imports.
+from typing import Any
+
+# Related third party imports.
+import pandas as pd
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+INTEGERS = {f"{XSD}{t}" for t in [
+    "integer", "int", "long", "short", "byte", "nonNegativeInteger",
+    "positiveInteger", "nonPositiveInteger", "negativeInteger",
+    "unsignedLong", "unsignedInt", "unsignedShort", "unsignedByte"]}
+FLOATS = {f"{XSD}{t}" for t in ["float", "double", "decimal"]}
+DATETIMES = {f"{XSD}{t}" for t in ["dateTime", "dateTimeStamp"]}
+DATES = {f"{XSD}date"}
+BOOLEANS = {f"{XSD}boolean"}
+
+# From pandas 2 on, to_datetime needs to be told that ISO 8601 values
+# may have different precisions, older versions parse them without a
+# format.
+ISO8601_VERSION = 2
+ISO8601 = {"format": "ISO8601"} \
+    if int(pd.__version__.split(".")[0]) >= ISO8601_VERSION else {}
+
+
+def typed_frame(data: dict[str, Any]) -> pd.DataFrame:
+    """
+    Build a data frame from a SPARQL JSON result, with typed columns.
+
+    :param data: The parsed SPARQL JSON result.
+    :return: A data frame with one column per variable.
+    """
+    colname = data["head"]["vars"]
+    bindings = data["results"]["bindings"]
+    columns = {}
+    for c in colname:
+        cells = [row.get(c) for row in bindings]
+        values = pd.Series([None if cell is None else cell["value"]
+                            for cell in cells], dtype=object)
+        kinds = {cell.get("datatype", cell["type"])
+                 for cell in cells if cell is not None}
+        kind = kinds.pop() if len(kinds) == 1 else None
+        columns[c] = convert(values, kind)
+    return pd.DataFrame(columns, columns=colname)
+
+
+def convert(values: pd.Series, kind: str | None) -> pd.Series:
+    """
+    Convert the string values of a column.
+
+    :param values: Values as strings, None where unbound.
+    :param kind: 'uri', 'literal', 'bnode' or the datatype uri of the
+      values, None if they have different types.
+    :return: The converted values, strings with missing values for
+      unbound ones if the type is unknown.
+    """
+    if kind in INTEGERS or kind in FLOATS:
+        return pd.to_numeric(values)
+    if kind in DATETIMES:
+        return pd.to_datetime(values, utc=True, **ISO8601)
+    if kind in DATES:
+        return pd.to_datetime(values, **ISO8601)
+    if kind in BOOLEANS:
+        return values.map({"true": True, "false": False,
+                           "1": True, "0": False}).astype("boolean")
+    if kind == "uri" and values.nunique() <= len(values) // 2:
+        return values.astype("category")
+    return values.astype("string")
@@ -0,0 +1,110 @@
+"""
+Incremental parser of SPARQL JSON results.
+
+The bindings of a result are decoded one by one while the response is
+read, so that neither the whole response text nor the whole parsed
+document is held in memory:
+
+>>> chunks = ['{"head": {"vars": ["s"]}, "results": {"bind',
+...           'ings": [{"s": {"type": "literal", "value": "a"}}, ',
+...           '{"s": {"type": "literal", "value": "b"}}]}}']
+>>> stream = BindingsStream(chunks)
+>>> stream.vars
+['s']
+>>> [b['s']['value'] for b in stream]
+['a', 'b']
+"""
+
+# Standard library imports.
+import json
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+HEAD_VARS = re.compile(r'"vars"\s*:\s*')
+BINDINGS = re.compile(r'"bindings"\s*:\s*\[')
+WHITESPACE = re.compile(r'[\s,]*')
+
+
+class BindingsStream:
+    def __init__(self, chunks: Iterable[str]) -> None:
+        """
+        :param chunks: The text of a SPARQL JSON result, in pieces of
+          any size.
+        :raise ValueError: A ValueError is raised if the text is not a
+          SPARQL JSON result.
+        """
+        self._chunks = iter(chunks)
+        self._buffer = ""
+        self._pos = 0
+        self._done = False
+        self._bindings: list[dict[str, Any]] | None = None
+        self.vars = self._read_head()
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        if self._bindings is not None:
+            yield from self._bindings
+            return
+        decoder = json.JSONDecoder()
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos == len(self._buffer):
+                if not self._read():
+                    msg = "Incomplete SPARQL JSON result"
+                    raise ValueError(msg)
+                continue
+            if self._buffer[self._pos] == "]":
+                return
+            try:
+                binding, end = decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # The binding continues in the next chunk.
+                if not self._read():
+                    raise
+                continue
+            self._pos = end
+            yield binding
+
+    def _read_head(self) -> list[str]:
+        vars_ = None
+        while True:
+            if vars_ is None:
+                match = HEAD_VARS.search(self._buffer)
+                if match is not None:
+                    try:
+                        vars_, _ = json.JSONDecoder().raw_decode(
+                            self._buffer, match.end())
+                    except json.JSONDecodeError:
+                        pass
+            match = BINDINGS.search(self._buffer)
+            if match is not None and vars_ is not None:
+                self._pos = match.end()
+                return vars_
+            if match is not None or not self._read():
+                # The head follows the results, or the text is no
+                # SPARQL result. Fall back to parsing the whole text.
+                return self._read_all()
+
+    def _read_all(self) -> list[str]:
+        while self._read():
+            pass
+        try:
+            document = json.loads(self._buffer)
+            self._bindings = document["results"]["bindings"]
+            return document["head"]["vars"]
+        except (ValueError, KeyError, TypeError) as e:
+            msg = "Not a SPARQL JSON result"
+            raise ValueError(msg) from e
+
+    def _read(self) -> bool:
+        """Append the next chunk to the buffer, False at the end."""
+        if self._done:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                # Drop the text which has been parsed already.
+                self._buffer = self._buffer[self._pos:] + chunk
+                self._pos = 0
+                return True
+        self._done = True
+        return False
@@ -0,0 +1,104 @@
+"""
+Paging of SPARQL select queries.
+
+A query is wrapped in a subquery, so that its own modifiers are kept,
+and its results are ordered by all the variables, which makes the order
+of the rows deterministic. The pages then never overlap:
+
+>>> print(page('SELECT ?s WHERE {?s ?p ?o}', ['s'], 1000, 2000))
+SELECT * WHERE { {
+SELECT ?s WHERE {?s ?p ?o}
+} } ORDER BY ?s LIMIT 1000 OFFSET 2000
+
+The order of a subquery is not kept by the outer query, so the ORDER BY
+conditions of the query are repeated before the variables, and can only
+use the variables of its result:
+
+>>> print(page('SELECT ?s ?o WHERE {?s ?p ?o} ORDER BY DESC(?o)',
+...            ['s', 'o'], 1000, 0))
+SELECT * WHERE { {
+SELECT ?s ?o WHERE {?s ?p ?o} ORDER BY DESC(?o)
+} } ORDER BY DESC(?o) ?s ?o LIMIT 1000 OFFSET 0
+
+The variables are not known before the query is run; they are read
+from the head of the result of probe(query), which has no rows.
+"""
+
+# Standard library imports.
+import re
+
+# Base and prefix declarations, and comments, before the query.
+PROLOGUE = re.compile(r'\s*(?:(?:PREFIX\s+[^\s:]*:\s*<[^>]*>|BASE\s*<[^>]*>'
+                      r'|#[^\n]*)\s*)*', re.IGNORECASE)
+SELECT = re.compile(r'SELECT\b', re.IGNORECASE)
+DATASET = re.compile(r'\bFROM\s+(?:NAMED\s+)?<[^>]*>', re.IGNORECASE)
+# Strings, IRIs and comments, which are skipped when looking for the
+# ORDER BY clause of a query.
+SKIPPED = re.compile(r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|'
+                     r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|'
+                     r'<[^<>"{}|^`\\\s]*>|#[^\n]*')
+ORDER_BY = re.compile(r'\bORDER\s+BY\b\s*(.*?)\s*'
+                      r'(?=\bLIMIT\b|\bOFFSET\b|\bVALUES\b|$)',
+                      re.IGNORECASE | re.DOTALL)
+
+
+def split(query: str) -> tuple[str, str, str]:
+    """
+    Split a select query into its prologue, its dataset clauses, which
+    are not allowed in a subquery, and the rest.
+
+    :raise ValueError: A ValueError is raised if the query is no select
+      query.
+    """
+    prologue = PROLOGUE.match(query).end()
+    rest = query[prologue:]
+    where = rest.find('{')
+    if not SELECT.match(rest) or where < 0:
+        msg = 'Only SELECT queries can be paged'
+        raise ValueError(msg)
+    dataset = ' '.join(DATASET.findall(rest[:where]))
+    body = DATASET.sub('', rest[:where]) + rest[where:]
+    return query[:prologue], dataset, body.strip()
+
+
+def order(query: str) -> str:
+    """The conditions of the ORDER BY clause of a select query, if any."""
+    body = split(query)[2]
+    # Blank out the skipped parts and the group graph patterns, so that
+    # only the clauses of the query itself are searched.
+    masked = list(SKIPPED.sub(lambda m: ' ' * len(m.group()), body))
+    depth = 0
+    for i, char in enumerate(masked):
+        depth -= char == '}'
+        if depth:
+            masked[i] = ' '
+        depth += char == '{'
+    match = ORDER_BY.search(''.join(masked))
+    return body[match.start(1):match.end(1)] if match else ''
+
+
+def probe(query: str) -> str:
+    """The query without rows, to read the variables of its result."""
+    return _wrap(query) + ' LIMIT 0'
+
+
+def page(query: str, colname: list[str], page_size: int,
+         offset: int) -> str:
+    """
+    One page of the query.
+
+    :param colname: The variables of the result of the query.
+    :param page_size: Rows per page.
+    :param offset: Rows before the page.
+    """
+    conditions = [order(query), *(f'?{c}' for c in colname)]
+    conditions = ' '.join(c for c in conditions if c)
+    order_by = f' ORDER BY {conditions}' if conditions else ''
+    return f'{_wrap(query)}{order_by} LIMIT {page_size} OFFSET {offset}'
+
+
+def _wrap(query: str) -> str:
+    prologue, dataset, body = split(query)
+    dataset = f'{dataset} ' if dataset else ''
+    # The body is on its own lines, in case it ends with a comment.
+    return f'{prologue}SELECT * {dataset}WHERE {{ {{\n{body}\n}} }}'
@@ -0,0 +1,247 @@
+"""
+Opt-in cache of SPARQL query results.
+
+Results of RunSparql.run() are kept in a size-bounded in-process LRU
+and, when the disk cache is enabled (see icoscp.cache), in its 'sparql'
+folder as well, so that they are reused across sessions. Entries expire
+after their time to live. The cache is keyed by the query, with
+insignificant whitespace removed, and the requested media type, so all
+output formats built from the same response share one entry.
+
+>>> from icoscp.sparql import resultcache
+>>> cache = resultcache.enable(ttl=3600)  # doctest: +SKIP
+>>> cache.hits, cache.misses  # doctest: +SKIP
+"""
+
+# Standard library imports.
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from typing import Any
+
+# Local application/library specific imports.
+import icoscp.const as c
+from icoscp import cache
+
+# Quoted strings and IRIs are kept as they are, comments and other
+# whitespace are collapsed into one space.
+TOKENS = re.compile(r'("""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|'
+                    r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|'
+                    r'<[^<>"{}|^`\\\s]*>)|(?:\s|#[^\n]*)+')
+
+
+@dataclass
+class Entry:
+    text: str
+    content_type: str
+    expires: float
+
+    def expired(self) -> bool:
+        return time.time() >= self.expires
+
+
+class CachedResponse:
+    """The parts of a requests.Response which RunSparql uses."""
+
+    ok = True
+    status_code = 200
+    reason = "OK"
+
+    def __init__(self, entry: Entry) -> None:
+        self.text = entry.text
+        self.headers = {"Content-Type": entry.content_type}
+        self.encoding = "utf-8"
+        self.raw = io.BytesIO(entry.text.encode("utf-8"))
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size: int = 1, *,
+                     decode_unicode: bool = False) -> Iterator[str | bytes]:
+        content = self.text if decode_unicode else \
+            self.text.encode(self.encoding)
+        for i in range(0, len(content), chunk_size):
+            yield content[i:i + chunk_size]
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "CachedResponse":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class ResultCache:
+    def __init__(self, ttl: float = c.SPARQL_CACHE_TTL_SEC,
+                 max_bytes: int = c.SPARQL_CACHE_MAX_BYTES) -> None:
+        """
+        :param ttl: Default time to live of an entry in seconds.
+        :param max_bytes: Size limit of the in-process cache, the disk
+          cache has its own limit.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries: OrderedDict[str, Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query: str, accept: str) -> CachedResponse | None:
+        """The cached response to a query, None if missing or expired."""
+        key = _key(query, accept)
+        entry = self._memory(key)
+        if entry is None:
+            entry = self._load(key)
+        if entry is None or entry.expired():
+            if entry is not None:
+                self._forget(key)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return CachedResponse(entry)
+
+    def store(self, query: str, accept: str, text: str, content_type: str,
+              ttl: float | None = None) -> CachedResponse:
+        """
+        Cache the response to a query.
+
+        :param ttl: Time to live in seconds, the default ttl if None.
+        :return: The cached response.
+        """
+        key = _key(query, accept)
+        entry = Entry(text=text, content_type=content_type,
+                      expires=time.time() + (self.ttl if ttl is None
+                                             else ttl))
+        self._remember(key, entry)
+        self._store(key, entry)
+        return CachedResponse(entry)
+
+    def clear(self) -> None:
+        """Empty the in-process cache and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _memory(self, key: str) -> Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _remember(self, key: str, entry: Entry) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old.text)
+            if len(entry.text) > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._size += len(entry.text)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.text)
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= len(entry.text)
+        path = _path(key)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def _load(self, key: str) -> Entry | None:
+        path = _path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = Entry(**json.load(f))
+            # Keeps the least recently used order of the disk cache.
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except (OSError, ValueError, TypeError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: Entry) -> None:
+        path = _path(key)
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def normalize(query: str) -> str:
+    """The query without comments and insignificant whitespace."""
+    return TOKENS.sub(lambda m: m.group(1) or " ", query).strip()
+
+
+def _key(query: str, accept: str) -> str:
+    return hashlib.sha256(
+        repr((normalize(query), accept)).encode()).hexdigest()
+
+
+def _path(key: str) -> str | None:
+    """Disk path of an entry, None if the disk cache is disabled."""
+    disk = cache.active()
+    if disk is None:
+        return None
+    return os.path.join(disk.folder, "sparql", key + ".json")
+
+
+_cache: ResultCache | None = None
+
+
+def enable(ttl: float = c.SPARQL_CACHE_TTL_SEC,
+           max_bytes: int = c.SPARQL_CACHE_MAX_BYTES) -> ResultCache:
+    """
+    Cache the results of RunSparql.run(). Results are also kept on
+    disk if icoscp.cache is enabled.
+
+    :param ttl: Default time to live of an entry in seconds, one hour
+      by default.
+    :param max_bytes: Size limit of the in-process cache, 256 MiB by
+      default.
+    :return: The active cache.
+    """
+    global _cache  # noqa: PLW0603
+    _cache = ResultCache(ttl=ttl, max_bytes=max_bytes)
+    return _cache
+
+
+def disable() -> None:
+    """Stop caching. Entries on disk are kept."""
+    global _cache  # noqa: PLW0603
+    _cache = None
+
+
+def active() -> ResultCache | None:
+    """The active cache, None if caching is disabled."""
+    return _cache
@@ -19,23 +19,115 @@ __lastchange__  = ["Zois Zogopoulos"]
 
 
 
-import requests
+import asyncio
+import csv
+import io
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+import icoscp.const as CPC
+from icoscp import session
+from icoscp.sparql import coltypes, paging, resultcache
+from icoscp.sparql.jsonstream import BindingsStream
+
+# Output formats which can be built from a CSV result.
+CSV_FORMATS = ['csv', 'pandas', 'array', 'html']
+
+SPARQL_HOST = 'meta.icos-cp.eu'
+
+# Threads which run the queries of RunSparql.arun().
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def set_concurrency(max_queries):
+    """
+        Set the number of queries RunSparql.arun() sends at the same
+        time, CPC.SPARQL_MAX_CONCURRENCY by default. Further queries
+        wait for a free slot. The connection pool of the shared session
+        to the endpoint is resized to match; the session and the pools
+        to other hosts are kept, see icoscp.session.
+        :param max_queries, int, positive
+    """
+    global _executor  # noqa: PLW0603
+    if max_queries < 1:
+        msg = (f"The value provided for the 'max_queries' parameter "
+               f"({max_queries}) must be positive")
+        raise ValueError(msg)
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=max_queries,
+                                       thread_name_prefix='icoscp-sparql')
+    session.set_host_pool_size(SPARQL_HOST, max_queries)
+
+
+def _get_executor():
+    global _executor  # noqa: PLW0603
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=CPC.SPARQL_MAX_CONCURRENCY,
+                thread_name_prefix='icoscp-sparql')
+        return _executor
+
+
 class RunSparql():
     """
         Class to send a sparql query to the icos endpoint and get
         formated output back.
         :param sparql_query, string, valid query
-        :param output_format, define format of returned object ['json', 'csv', 'array', 'dict', 'pandas']
+        :param output_format, define format of returned object ['json', 'csv', 'array', 'dict', 'pandas', 'iter']
+        :param transport, 'json' (default) or 'csv'. With 'csv' the result
+            is requested as text/csv and read with pandas.read_csv, for
+            the output formats 'csv', 'pandas', 'array' and 'html'.
+            JSON is used if the endpoint does not answer with CSV.
+        :param typed, bool, if True the 'pandas', 'array' and 'html'
+            outputs convert each column to the type declared in the
+            result (numbers, dates, booleans), and uri columns with
+            repeated values to categories, see icoscp.sparql.coltypes.
+            Typed results are always transported as JSON, which
+            carries the datatypes. Default False, all values are
+            strings.
+        :param cache_ttl, seconds the result is kept in the result
+            cache, if enabled with icoscp.sparql.resultcache.enable().
+            Default None, the ttl of the cache. With disable_cache the
+            result cache is neither read nor written.
+        :param page_size, int, optional. If provided, the results of a
+            SELECT query are fetched in pages of page_size rows, ordered
+            by all variables, see icoscp.sparql.paging. Pages are
+            transported as JSON.
+        :param max_workers, int, number of pages requested at the same
+            time, CPC.SPARQL_PAGE_WORKERS by default.
         :return False, if query is not successful otherwise output_format(results)
     """
 
-    def __init__(self, sparql_query='', output_format='txt', disable_cache=False):
+    def __init__(self, sparql_query='', output_format='txt',  # noqa: PLR0913
+                 disable_cache=False, *, transport='json', typed=False,
+                 cache_ttl=None, page_size=None,
+                 max_workers=CPC.SPARQL_PAGE_WORKERS):
 
         self.format = output_format
         self.query = sparql_query
         self.__disable_cache = disable_cache
+        if transport not in ['json', 'csv']:
+            msg = f"Unsupported transport: {transport}, use 'json' or 'csv'."
+            raise ValueError(msg)
+        self.__transport = transport
+        self.__typed = typed
+        self.__cache_ttl = cache_ttl
+        for name, value in [('page_size', page_size),
+                            ('max_workers', max_workers)]:
+            if value is not None and value < 1:
+                msg = (f"The value provided for the '{name}' parameter "
+                       f"({value}) must be positive")
+                raise ValueError(msg)
+        self.__page_size = page_size
+        self.__max_workers = max_workers
         self.__result = False
 
     @property
@@ -55,8 +147,9 @@ class RunSparql():
             - 'pandas' a pandas table with column names
             - 'list'
             - 'array' returns TWO python arrays, the first with the headers, the second with the values.
+            - 'iter' an iterator of rows, see iter_rows()
         """
-        allowed = ['json', 'csv', 'dict', 'pandas', 'array', 'html']
+        allowed = ['json', 'csv', 'dict', 'pandas', 'array', 'html', 'iter']
         try:
             fmt = str(fmt)
         except TypeError:
@@ -96,19 +189,27 @@ class RunSparql():
             print('no query found')
             return
 
-        url = 'https://meta.icos-cp.eu/sparql'
-
-        headers = {"Accept": "application/json"}
-
-        if self.__disable_cache:
-            headers["Cache-Control"] = "no-cache"
-            headers["Pragma"] = "no-cache"
+        if self.__page_size is not None:
+            return self.__run_pages()
 
-        r = requests.post(url=url, headers=headers, data=bytes(self.__query, "utf-8"))
+        csv_transport = self.__transport == 'csv' and \
+            self.__format in CSV_FORMATS and \
+            not (self.__typed and self.__format != 'csv')
+        r = self.__response(
+            stream=self.__format in ['iter', 'csv'] or csv_transport,
+            accept=CPC.SPARQL_CSV_ACCEPT if csv_transport else None)
         if not r.ok:
             print(r.ok, r.reason)
             return r.ok, r.reason
 
+        if self.__format == 'iter':
+            self.__result = self.__iter_rows(self.__stream(r))
+            return self.__result
+        if csv_transport and \
+                r.headers.get('Content-Type', '').startswith('text/csv'):
+            self.__result = self.__from_csv(r)
+            return self.__result
+
         # now check what format we should return.
         # either set the __result directly, or call a transform
         # function which sets the __result.
@@ -118,20 +219,263 @@ class RunSparql():
         if self.__format == 'dict':
             self.__result = r.json()
         if self.__format == 'csv':
-            self.__result = self.__to_csv(r.json())
-        if self.__format == 'pandas':
-            self.__result = self.__to_pandas(r.json())
+            self.__result = self.__to_csv(self.__stream(r))
+        if self.__format in ['pandas', 'array', 'html']:
+            self.__result = self.__from_json(r.json())
+        return self.__result
+
+    async def arun(self):
+        """
+            Asyncio counterpart of run(), with the same output formats.
+            The query is sent from a thread over the shared session, so
+            that the event loop is not blocked, and at most
+            CPC.SPARQL_MAX_CONCURRENCY queries are sent at the same
+            time, see set_concurrency(). The 'iter' output is a regular
+            iterator which reads from the network while iterated.
+
+            results = await asyncio.gather(*[q.arun() for q in queries])
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), self.run)
+
+    # ------------------------------------------------------------------------
+    def iter_rows(self, batch_size=None):
+        """
+            Run the query and iterate over the result while it is
+            downloaded, without holding the whole result in memory.
+            Each row is a dict {variable: value}, unbound variables
+            are None.
+            :param batch_size, int, optional. If provided, pandas
+                DataFrames of up to batch_size rows are yielded instead
+                of single rows.
+            :return iterator of rows or DataFrames
+            :raise requests.HTTPError if the query is not successful
+        """
+        if batch_size is not None and batch_size < 1:
+            msg = (f"The value provided for the 'batch_size' parameter "
+                   f"({batch_size}) must be positive")
+            raise ValueError(msg)
+        return self.__iter_rows(self.__rows(), batch_size)
+
+    def write_csv(self, file=None):
+        """
+            Run the query and write the result as CSV, while it is
+            downloaded. Values are quoted where needed and unbound
+            variables are written as empty values.
+            :param file, file-like object opened in text mode, optional.
+                If not provided, the CSV is returned as a string.
+            :return str if no file is provided, otherwise None
+            :raise requests.HTTPError if the query is not successful
+        """
+        return self.__to_csv(self.__rows(), file)
+
+    def __rows(self):
+        """ Column names and an iterator of the rows of the result. """
+        if self.__page_size is not None:
+            r = self.__response(query=paging.probe(self.__query))
+            r.raise_for_status()
+            colname = r.json()['head']['vars']
+            return colname, self.__values(colname, self.__pages(colname))
+        r = self.__post(stream=True)
+        try:
+            r.raise_for_status()
+        except Exception:
+            r.close()
+            raise
+        return self.__stream(r)
+
+    def __iter_rows(self, stream, batch_size=None):
+        colname, rows = stream
+        batch = []
+        for values in rows:
+            row = dict(zip(colname, values))
+            if batch_size is None:
+                yield row
+                continue
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield pd.DataFrame(batch, columns=colname)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=colname)
+
+    def __stream(self, r):
+        """
+            Column names and an iterator of the rows of a streamed
+            json response, which is closed after the last row.
+        """
+        if r.encoding is None:
+            r.encoding = 'utf-8'
+        try:
+            stream = BindingsStream(r.iter_content(
+                chunk_size=CPC.SPARQL_CHUNK_SIZE, decode_unicode=True))
+        except Exception:
+            r.close()
+            raise
+        colname = stream.vars
+
+        def rows():
+            with r:
+                for binding in stream:
+                    yield [binding.get(c, {}).get('value') for c in colname]
+
+        return colname, rows()
+
+    # ------------------------------------------------------------------------
+    def __run_pages(self):
+        """ run() for a query fetched in pages. """
+        r = self.__response(query=paging.probe(self.__query))
+        if not r.ok:
+            print(r.ok, r.reason)
+            return r.ok, r.reason
+        self.__result = self.__from_pages(r.json()['head']['vars'])
+        return self.__result
+
+    def __from_pages(self, colname):
+        """ Build the output format from the pages of the query. """
+        bindings = self.__pages(colname)
+        if self.__format == 'iter':
+            return self.__iter_rows(
+                (colname, self.__values(colname, bindings)))
+        if self.__format == 'csv':
+            return self.__to_csv((colname, self.__values(colname, bindings)))
+        data = {'head': {'vars': colname},
+                'results': {'bindings': list(bindings)}}
+        if self.__format == 'json':
+            return json.dumps(data)
+        if self.__format == 'dict':
+            return data
+        return self.__from_json(data)
+
+    def __pages(self, colname):
+        """
+            Iterator of the bindings of all pages, in order. Up to
+            max_workers pages are requested ahead; the first page with
+            less than page_size rows is the last one.
+        """
+        with ThreadPoolExecutor(max_workers=self.__max_workers) as pool:
+            pending = deque()
+            offset = 0
+
+            def request_page():
+                nonlocal offset
+                query = paging.page(self.__query, colname,
+                                    self.__page_size, offset)
+                pending.append(pool.submit(self.__page, query))
+                offset += self.__page_size
+
+            for _ in range(self.__max_workers):
+                request_page()
+            try:
+                while pending:
+                    page = pending.popleft().result()
+                    if len(page) < self.__page_size:
+                        yield from page
+                        return
+                    request_page()
+                    yield from page
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def __page(self, query):
+        r = self.__response(query=query)
+        r.raise_for_status()
+        return r.json()['results']['bindings']
+
+    @staticmethod
+    def __values(colname, bindings):
+        """ Rows of the values of bindings, None where unbound. """
+        for binding in bindings:
+            yield [binding.get(c, {}).get('value') for c in colname]
+
+    # ------------------------------------------------------------------------
+    def __response(self, *, stream=False, accept=None, query=None):
+        """
+            The response to the query, from the result cache if it is
+            enabled. Iterated results are not cached.
+            :param query, str, the query to send instead of the query
+                of this instance, like a page of it.
+        """
+        query = query or self.__query
+        results = resultcache.active()
+        if results is None or self.__disable_cache or \
+                (stream and self.__format == 'iter'):
+            return self.__post(stream=stream, accept=accept, query=query)
+        accept = accept or 'application/json'
+        cached = results.get(query, accept)
+        if cached is not None:
+            return cached
+        r = self.__post(accept=accept, query=query)
+        if not r.ok:
+            return r
+        content_type = r.headers.get('Content-Type', '')
+        if 'charset' not in content_type:
+            # Sparql results are utf-8 encoded.
+            r.encoding = 'utf-8'
+        return results.store(query, accept, r.text, content_type,
+                             ttl=self.__cache_ttl)
+
+    def __post(self, *, stream=False, accept=None, query=None):
+        """ Send the query to the ICOS sparql endpoint. """
+        url = f'https://{SPARQL_HOST}/sparql'
+
+        headers = {"Accept": accept or "application/json"}
+
+        if self.__disable_cache:
+            headers["Cache-Control"] = "no-cache"
+            headers["Pragma"] = "no-cache"
+
+        return session.post(url=url, headers=headers,
+                            data=bytes(query or self.__query, "utf-8"),
+                            stream=stream)
+
+    # ------------------------------------------------------------------------
+    def __from_csv(self, r):
+        """ Build the output format from a text/csv response. """
+        with r:
+            if self.__format == 'csv':
+                # Written again like the json transport, the server
+                # quotes differently and ends lines with '\r\n'.
+                rows = csv.reader(io.StringIO(r.text))
+                return self.__to_csv((next(rows, []), rows))
+            # Let urllib3 undo a gzip or deflate content encoding.
+            r.raw.decode_content = True
+            try:
+                # Values are kept as strings, like in the json transport.
+                df = pd.read_csv(r.raw, engine='c', encoding='utf-8',
+                                 dtype=str, keep_default_na=False,
+                                 na_values=[''])
+            except pd.errors.EmptyDataError:
+                df = pd.DataFrame()
         if self.__format == 'array':
-            self.__result = self.__to_array(r.json())
+            coldata = df.astype(object).where(df.notna(), None)
+            return list(df.columns), coldata.values.tolist()
         if self.__format == 'html':
-            self.__result = self.__to_html(r.json())
-        return self.__result
+            return df.to_html(classes='table table-striped table-hover')
+        return df
+
+    def __from_json(self, data):
+        """ Build the 'pandas', 'array' or 'html' output. """
+        if self.__format == 'pandas':
+            return self.__to_pandas(data)
+        if self.__format == 'array':
+            return self.__to_array(data)
+        return self.__to_html(data)
 
     # ------------------------------------------------------------------------
     def __to_array(self, data):
 
         # convert the the result into two arrays
         # colName, colData
+        if self.__typed:
+            df = coltypes.typed_frame(data)
+            coldata = df.astype(object).where(df.notna(), None)
+            return list(df.columns), coldata.values.tolist()
+        return self.__to_strings(data)
+
+    def __to_strings(self, data):
+        """ Column names and rows of the values as strings. """
         colname = data['head']['vars']
         coldata = []
 
@@ -143,28 +487,29 @@ class RunSparql():
         return colname, coldata
 
     # ------------------------------------------------------------------------
-    def __to_csv(self, data):
-        colname, coldata = self.__to_array(data)
-
+    def __to_csv(self, stream, file=None):
+        """ Write streamed rows as CSV, row by row. """
+        colname, rows = stream
+        out = io.StringIO() if file is None else file
+        writer = csv.writer(out, lineterminator='\n')
         # add the header line
-        csvstring = ','.join(colname) + '\n'
-        for row in coldata:
-            csvstring += ','.join(row) + '\n'
-
-        return csvstring
+        writer.writerow(colname)
+        writer.writerows(rows)
+        return out.getvalue() if file is None else None
 
     # ------------------------------------------------------------------------
     def __to_pandas(self, data):
 
+        if self.__typed:
+            return coltypes.typed_frame(data)
         colname, coldata = self.__to_array(data)
 
         return pd.DataFrame(coldata, columns=colname)
     # ------------------------------------------------------------------------
 
     def __to_html(self, data):
-        colname, coldata = self.__to_array(data)
 
-        return pd.DataFrame(coldata, columns=colname).to_html(classes='table table-striped table-hover')
+        return self.__to_pandas(data).to_html(classes='table table-striped table-hover')
 
 
 
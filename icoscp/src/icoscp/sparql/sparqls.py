@@ -255,6 +255,35 @@ def collections(id=None):
     return query
 
 
+# -----------------------------------------------------------------------------
+def collection_members():
+    """
+    Return the items of all collections and their number, one row per
+    collection, with the item URIs separated by spaces in ?dobj.
+
+    Returns
+    -------
+    query : STR
+        A query, which can be run against the SPARQL endpoint.
+    """
+
+    query = """
+            prefix cpmeta: <http://meta.icos-cp.eu/ontologies/cpmeta/>
+            prefix dcterms: <http://purl.org/dc/terms/>
+            select ?collection
+            (group_concat(distinct str(?item); separator=" ") as ?dobj)
+            (count(distinct ?item) as ?count)
+            where{
+            ?collection a cpmeta:Collection .
+            OPTIONAL{?collection dcterms:hasPart ?item}
+            FILTER NOT EXISTS {[] cpmeta:isNextVersionOf ?collection}
+            }
+            group by ?collection
+            """
+
+    return query
+
+
 # -----------------------------------------------------------------------------
 def collection_items(id):
     
@@ -25,6 +25,8 @@ from folium.plugins import MarkerCluster
 import folium
 import pandas as pd
 import requests
+# Local application/library specific imports.
+from icoscp import session
 
 
 def get(queried_stations, project, icon):
@@ -143,7 +145,7 @@ def request_rest_countries():
     try:
         # Try to request countries data from
         # https://restcountries.com/ REST-ful API.
-        response_com = requests.get(
+        response_com = session.get(
             'https://restcountries.com/v2/all?fields=name,flags,alpha2Code')
         response_com.raise_for_status()
     except (requests.exceptions.HTTPError, requests.exceptions.SSLError) as e:
@@ -0,0 +1,126 @@
+"""
+pandas, Arrow and Polars tables over the decoded columns of data objects.
+
+pandas data frames adopt the columns without copying them. Columns kept
+by a data object are only shared where pandas copies on write, so that
+changes to a frame never alter them; older pandas versions get copies
+of them. Arrow tables
+are built over the numpy buffers of the columns, so numeric and time
+columns are not copied. Time columns become Arrow timestamp,
+date and duration types, and character columns, like quality flags,
+become dictionary-encoded strings.
+
+pyarrow and polars are optional dependencies:
+
+    pip install icoscp[arrow]
+    pip install icoscp[polars]
+"""
+
+# Standard library imports.
+import importlib
+from collections.abc import Collection
+from types import ModuleType
+from typing import Any
+
+# Related third party imports.
+import numpy as np
+import pandas as pd
+
+# First major version of pandas which always copies on write.
+COPY_ON_WRITE_VERSION = 3
+
+def to_pandas(arrays: dict[str, Any],
+              shared: Collection[str] = ()) -> pd.DataFrame:
+    """
+    Build a pandas.DataFrame from columns, in the order of the
+    dictionary, without copying them.
+
+    :param arrays: numpy arrays or pandas series by column name.
+    :param shared: Names of the columns which are kept elsewhere, like
+      the columns kept by a data object. They are copied where pandas
+      does not copy on write, otherwise they must be pandas series so
+      that pandas tracks the references.
+    :return: A pandas.DataFrame, which shares no writable memory with
+      the shared columns.
+    """
+    if not copy_on_write():
+        arrays = {name: values.copy() if name in shared else values
+                  for name, values in arrays.items()}
+    return pd.DataFrame(arrays, copy=False)
+
+
+def copy_on_write() -> bool:
+    """
+    True if pandas copies on write, always from pandas 3 on, and before
+    if enabled with pd.options.mode.copy_on_write = True.
+    """
+    if int(pd.__version__.split(".")[0]) >= COPY_ON_WRITE_VERSION:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except KeyError:
+        # pandas < 1.5 has no copy on write.
+        return False
+
+
+def to_arrow(arrays: dict[str, np.ndarray]) -> Any:
+    """
+    Build a pyarrow.Table from columns, in the order of the dictionary.
+
+    :param arrays: numpy arrays by column name.
+    :return: A pyarrow.Table.
+    :raise ImportError: An ImportError is raised if pyarrow is not
+      installed.
+    """
+    pa = _require("pyarrow", "arrow")
+    return pa.table({name: _arrow_array(pa, values)
+                     for name, values in arrays.items()})
+
+
+def to_polars(arrays: dict[str, np.ndarray]) -> Any:
+    """
+    Build a polars.DataFrame from columns, via Arrow.
+
+    :param arrays: numpy arrays by column name.
+    :return: A polars.DataFrame.
+    :raise ImportError: An ImportError is raised if pyarrow or polars
+      is not installed.
+    """
+    pl = _require("polars", "polars")
+    return pl.from_arrow(to_arrow(arrays), rechunk=False)
+
+
+def _arrow_array(pa: ModuleType, values: np.ndarray) -> Any:
+    values = np.asarray(values)
+    if not values.dtype.isnative:
+        values = values.astype(values.dtype.newbyteorder("="))
+    kind = values.dtype.kind
+    if kind in "UO":
+        # Few distinct values, like quality flags.
+        return pa.array(values, type=pa.string()).dictionary_encode()
+    if kind == "M":
+        unit = np.datetime_data(values.dtype)[0]
+        if unit == "D":
+            return pa.array(values.view(np.int64).astype(np.int32),
+                            type=pa.date32())
+        if unit not in ("s", "ms", "us", "ns"):
+            # Months and other units Arrow has no timestamp type for.
+            values = values.astype("datetime64[s]")
+            unit = "s"
+        return pa.array(values, type=pa.timestamp(unit))
+    if kind == "m":
+        unit = np.datetime_data(values.dtype)[0]
+        if unit not in ("s", "ms", "us", "ns"):
+            values = values.astype("timedelta64[s]")
+            unit = "s"
+        return pa.array(values, type=pa.duration(unit))
+    return pa.array(values)
+
+
+def _require(module: str, extra: str) -> ModuleType:
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        msg = (f"The '{extra}' format requires {module}, install it with "
+               f"'pip install icoscp[{extra}]'")
+        raise ImportError(msg) from e
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+from icoscp.cache import DiskCache
+
+PID = 'https://meta.icos-cp.eu/objects/j7-Lxlln8_ysi4DEV8qine_v'
+
+
+def test_store_and_load(tmp_path):
+    disk = DiskCache(folder=str(tmp_path))
+    arrays = {'TIMESTAMP': np.arange(3).astype('datetime64[ms]'),
+              'Flag': np.array(['O', 'U', 'N']),
+              'co2': np.array([1, 2, 3], dtype='>f4')}
+    assert disk.load(PID, ('co2', None)) is None
+    assert disk.store(PID, ('co2', None), arrays)
+    loaded = disk.load(PID, ('co2', None))
+    assert list(loaded) == list(arrays)
+    for name, values in arrays.items():
+        np.testing.assert_array_equal(loaded[name], values)
+        assert loaded[name].dtype == values.dtype
+    assert disk.load(PID, ('co2', (0, 2))) is None
+
+
+def test_objects_are_not_stored(tmp_path):
+    disk = DiskCache(folder=str(tmp_path))
+    assert not disk.store(PID, 'key', {'a': np.array(['x', None])})
+    assert disk.size() == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    arrays = {'a': np.zeros(1000)}
+    disk = DiskCache(folder=str(tmp_path), max_bytes=10**9)
+    for key in ['first', 'second']:
+        disk.store(PID, key, arrays)
+    entry_size = disk.size() // 2
+    old = disk._path(PID, 'first')
+    os.utime(old, (1, os.stat(old).st_mtime))
+    disk.load(PID, 'first')
+    new = disk._path(PID, 'second')
+    os.utime(new, (2, os.stat(new).st_mtime))
+    disk.max_bytes = 2 * entry_size
+    disk.store(PID, 'third', arrays)
+    assert disk.load(PID, 'second') is None
+    assert disk.load(PID, 'first') is not None
+    assert disk.load(PID, 'third') is not None
+
+
+def test_store_walks_the_folder_only_when_full(tmp_path, monkeypatch):
+    disk = DiskCache(folder=str(tmp_path), max_bytes=10**9)
+    walks = []
+    entries = disk._entries
+    monkeypatch.setattr(disk, '_entries',
+                        lambda: walks.append(1) or entries())
+    for key in ['first', 'second', 'third']:
+        disk.store(PID, key, {'a': np.zeros(1000)})
+    # The first store counts the size of the cache.
+    assert len(walks) == 1
+    disk.max_bytes = disk.size() - 1
+    disk.store(PID, 'fourth', {'a': np.zeros(1000)})
+    assert len(walks) == 3
+    assert disk.size() <= disk.max_bytes
+
+
+def test_invalidate(tmp_path):
+    disk = DiskCache(folder=str(tmp_path))
+    disk.store(PID, 'key', {'a': np.zeros(3)})
+    disk.invalidate(PID)
+    assert disk.load(PID, 'key') is None
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from icoscp.collection import collection
+from icoscp.sparql import runsparql
+
+COLLECTIONS = 'https://meta.icos-cp.eu/collections/'
+OBJECTS = 'https://meta.icos-cp.eu/objects/'
+
+
+class FakeResponse:
+    ok = True
+    reason = 'OK'
+
+    def __init__(self, result):
+        self.headers = {'Content-Type': 'application/sparql-results+json'}
+        self.text = json.dumps(result)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def literal(value):
+    return {'type': 'literal', 'value': value}
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    """A fake endpoint with n collections, collection i having i items."""
+    queries = []
+
+    def answer(n):
+        def post(url, headers, data, stream=False):
+            query = data.decode()
+            queries.append(query)
+            ids = [f'{COLLECTIONS}c{i}' for i in range(n)]
+            if 'group_concat' in query:
+                bindings = [
+                    {'collection': {'type': 'uri', 'value': c},
+                     'dobj': literal(' '.join(f'{OBJECTS}{i}-{j}'
+                                              for j in range(i))),
+                     'count': literal(str(i))}
+                    for i, c in enumerate(ids)]
+                names = ['collection', 'dobj', 'count']
+            else:
+                assert 'hasPart' not in query
+                bindings = [{'collection': {'type': 'uri', 'value': c},
+                             'title': literal(f'title {i}')}
+                            for i, c in enumerate(ids)]
+                names = ['collection', 'doi', 'title', 'description']
+            return FakeResponse({'head': {'vars': names},
+                                 'results': {'bindings': bindings}})
+
+        monkeypatch.setattr(runsparql.session, 'post', post)
+        return queries
+
+    return answer
+
+
+@pytest.mark.parametrize('n', [1, 10, 200])
+def test_get_id_list_runs_a_fixed_number_of_queries(endpoint, n):
+    queries = endpoint(n)
+    coll = collection.getIdList()
+    assert len(queries) == 2
+    assert len(coll) == n
+    assert coll['count'].tolist() == list(range(n))
+    assert coll['dobj'][0] == []
+    assert coll['dobj'][n - 1] == [f'{OBJECTS}{n - 1}-{j}'
+                                   for j in range(n - 1)]
+    assert list(coll.columns) == ['collection', 'doi', 'title',
+                                  'description', 'dobj', 'count']
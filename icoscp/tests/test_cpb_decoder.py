@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import icoscp.const as CPC
+from icoscp.cpb import decoder
+
+NAMES = ['Flag', 'NbPoints', 'TIMESTAMP', 'co2', 'date', 'time']
+SCHEMA = ['CHAR', 'INT', 'DOUBLE', 'FLOAT', 'INT', 'INT']
+FORMATS = [f'{CPC.CP_META}{f}' for f in ['bmpChar', 'int32',
+                                         'iso8601dateTime', 'float32',
+                                         'iso8601date', 'iso8601timeOfDay']]
+COLUMNS = [
+    np.array([ord('O'), ord('U'), 0x00e5], dtype='>i2'),
+    np.array([1, -2, 3], dtype='>i4'),
+    np.array([1.5e12, 1.5e12 + 0.25, 1.6e12], dtype='>f8'),
+    np.array([410.5, np.nan, 420.25], dtype='>f4'),
+    np.array([0, 19000, -1], dtype='>i4'),
+    np.array([0, 3600, 86399], dtype='>i4'),
+]
+PAYLOAD = b''.join(c.tobytes() for c in COLUMNS)
+
+
+def test_numpy_engine_matches_struct_engine():
+    numpy_df = decoder.unpack(PAYLOAD, NAMES, SCHEMA, FORMATS, rows=3)
+    struct_df = decoder.unpack(PAYLOAD, NAMES, SCHEMA, FORMATS, rows=3,
+                               engine='struct')
+    pd.testing.assert_frame_equal(numpy_df, struct_df, check_dtype=False)
+
+
+def test_numpy_engine_column_subset():
+    payload = COLUMNS[0].tobytes() + COLUMNS[3].tobytes()
+    df = decoder.unpack(payload, ['Flag', 'co2'], ['CHAR', 'FLOAT'],
+                        [FORMATS[0], FORMATS[3]], rows=3)
+    assert df['Flag'].tolist() == ['O', 'U', 'å']
+    assert df['co2'].dtype == np.float64
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        decoder.unpack(PAYLOAD, NAMES, SCHEMA, FORMATS, rows=3,
+                       engine='unknown')
+
+
+def test_stream_columns_matches_unpack():
+    chunks = [PAYLOAD[i:i + 5] for i in range(0, len(PAYLOAD), 5)]
+    values = decoder.stream_columns(chunks, SCHEMA, rows=3)
+    streamed_df = decoder.frame(NAMES, SCHEMA, FORMATS, values)
+    pd.testing.assert_frame_equal(
+        streamed_df, decoder.unpack(PAYLOAD, NAMES, SCHEMA, FORMATS, rows=3))
+
+
+def test_stream_columns_incomplete_payload():
+    with pytest.raises(IOError):
+        decoder.stream_columns([PAYLOAD[:-1]], SCHEMA, rows=3)
+
+
+@pytest.mark.parametrize('selected', [[0, 1, 2, 3, 4, 5], [3], [5, 0, 2]])
+def test_mmap_columns_matches_unpack(tmp_path, selected):
+    path = tmp_path / 'table.cpb'
+    path.write_bytes(PAYLOAD)
+    values = decoder.mmap_columns(str(path), SCHEMA, selected, rows=3)
+    names = [NAMES[c] for c in selected]
+    expected = decoder.unpack(PAYLOAD, NAMES, SCHEMA, FORMATS, rows=3)
+    # The columns are views of the file, not copies.
+    assert all(not v.flags.writeable for v in values)
+    for first, last in [(0, 3), (1, 3), (0, 1), (2, 2)]:
+        df = decoder.frame(names, [SCHEMA[c] for c in selected],
+                           [FORMATS[c] for c in selected],
+                           [v[first:last] for v in values])
+        pd.testing.assert_frame_equal(
+            df, expected[names].iloc[first:last].reset_index(drop=True))
+
+
+def test_mmap_columns_empty_file(tmp_path):
+    path = tmp_path / 'table.cpb'
+    path.write_bytes(b'')
+    values = decoder.mmap_columns(str(path), SCHEMA, [1, 3], rows=0)
+    assert [len(v) for v in values] == [0, 0]
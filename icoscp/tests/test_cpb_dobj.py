@@ -0,0 +1,158 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import icoscp.const as CPC
+from icoscp.cpb import dobj as legacy
+from icoscp.cpb import metadata
+
+N_ROWS = 6
+FOLDER = 'asciiAtcProductTimeSer'
+FORMATS = {'Flag': 'bmpChar', 'NbPoints': 'int32',
+           'TIMESTAMP': 'iso8601dateTime', 'co2': 'float32'}
+# Raw columns, as stored in the binary files. The TIMESTAMP column is
+# hourly from 2017-07-14 00:00.
+COLUMNS = {
+    'Flag': np.array([ord(f) for f in 'OONOUO'], dtype='>i2'),
+    'NbPoints': np.arange(N_ROWS, dtype='>i4'),
+    'TIMESTAMP': (1.4999904e12 + 3.6e6 * np.arange(N_ROWS)).astype('>f8'),
+    'co2': np.linspace(400, 405, N_ROWS).astype('>f4'),
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), 5):
+            yield self.body[i:i + 5]
+
+
+@pytest.fixture
+def cpb(monkeypatch, tmp_path):
+    """
+    A legacy Dobj over COLUMNS, read from a local .cpb file if local is
+    True, otherwise from a fake cpb server. The TIMESTAMP column can be
+    replaced by hours after 2017-07-14. Returns the Dobj and the
+    payloads posted to the server.
+    """
+    columns = dict(COLUMNS)
+    meta = {
+        'specificInfo': {'nRows': N_ROWS, 'columns': [
+            {'label': name, 'valueType': {'self': {'label': name}},
+             'valueFormat': f'{CPC.CP_META}{fmt}'}
+            for name, fmt in FORMATS.items()]},
+        'specification': {'format': {'uri': f'{CPC.CP_META}{FOLDER}'}}}
+    posted, responses, reported = [], [], []
+
+    def post(url, json, stream, headers):
+        posted.append(json)
+        names = sorted(columns)
+        first, count = (json['slice']['offset'], json['slice']['length']) \
+            if 'slice' in json else (0, N_ROWS)
+        responses.append(FakeResponse(b''.join(
+            columns[names[c]][first:first + count].tobytes()
+            for c in json['columnNumbers'])))
+        return responses[-1]
+
+    monkeypatch.setattr(metadata, 'get', lambda pid, fmt='dict': meta)
+    monkeypatch.setattr(CPC, 'LOCALDATA', f'{tmp_path}/')
+    monkeypatch.setattr(legacy.session, 'post', post)
+    monkeypatch.setattr(legacy.portaluse, 'report',
+                        lambda event: reported.append(event) or True)
+    monkeypatch.setattr(legacy, 'cpauth', SimpleNamespace(cookie_value=''))
+
+    def make(local, hours=None):
+        if hours is not None:
+            columns['TIMESTAMP'] = (COLUMNS['TIMESTAMP'][0] + 3.6e6 *
+                                    np.array(hours)).astype('>f8')
+        if local:
+            (tmp_path / FOLDER).mkdir(exist_ok=True)
+            (tmp_path / FOLDER / 'abc.cpb').write_bytes(
+                b''.join(columns[n].tobytes() for n in sorted(columns)))
+        dobj = legacy.Dobj('https://meta.icos-cp.eu/objects/abc')
+        dobj.responses, dobj.reported = responses, reported
+        return dobj, posted
+
+    return make
+
+
+def test_get_reads_local_file(cpb):
+    dobj, posted = cpb(local=True)
+    df = dobj.get(['co2', 'Flag'], offset=1, length=3)
+    assert not posted
+    assert list(df.columns) == ['Flag', 'co2']
+    assert df['Flag'].tolist() == ['O', 'N', 'O']
+    assert df['co2'].tolist() == COLUMNS['co2'][1:4].astype(float).tolist()
+    df = dobj.get()
+    assert df['NbPoints'].tolist() == list(range(N_ROWS))
+    assert df['TIMESTAMP'][0] == pd.Timestamp('2017-07-14')
+    assert not posted
+
+
+@pytest.mark.parametrize('local', [True, False])
+def test_get_time_window(cpb, local):
+    dobj, posted = cpb(local)
+    df = dobj.get(['co2'], start='2017-07-14T02:00', end='2017-07-14T04:30Z')
+    assert df['co2'].tolist() == COLUMNS['co2'][2:5].astype(float).tolist()
+    if not local:
+        # The TIMESTAMP column, then the rows of the window.
+        assert [p['columnNumbers'] for p in posted] == [[2], [3]]
+        assert 'slice' not in posted[0]
+        assert posted[1]['slice'] == {'offset': 2, 'length': 3}
+
+
+def test_get_time_window_unsorted(cpb):
+    dobj, posted = cpb(local=False, hours=[0, 3, 5, 1, 2, 4])
+    df = dobj.get(['NbPoints', 'TIMESTAMP'], start='2017-07-14T01:00',
+                  end='2017-07-14T04:00')
+    # Rows 1 to 4 span the window, row 2 is outside of it.
+    assert posted[1]['slice'] == {'offset': 1, 'length': 4}
+    assert df['NbPoints'].tolist() == [1, 3, 4]
+    assert df['TIMESTAMP'].dt.hour.tolist() == [3, 1, 2]
+
+
+def test_time_windows_download_timestamps_once(cpb):
+    dobj, posted = cpb(local=False)
+    dobj.get(['co2'], start='2017-07-14T02:00', end='2017-07-14T04:30')
+    df = dobj.get(['co2'], start='2017-07-14T01:00', end='2017-07-14T03:30')
+    assert df['co2'].tolist() == COLUMNS['co2'][1:4].astype(float).tolist()
+    assert [p['columnNumbers'] for p in posted] == [[2], [3], [3]]
+    # Every download is reported, and every response is closed.
+    assert len(dobj.reported) == len(posted)
+    assert all(response.closed for response in dobj.responses)
+
+
+@pytest.mark.parametrize('local', [True, False])
+def test_iter_chunks_reports_usage_once(cpb, monkeypatch, local):
+    dobj, posted = cpb(local)
+    mapped = []
+    mmap_columns = legacy.decoder.mmap_columns
+    monkeypatch.setattr(legacy.decoder, 'mmap_columns',
+                        lambda *args, **kwargs: mapped.append(args) or
+                        mmap_columns(*args, **kwargs))
+    chunks = list(dobj.iter_chunks(['co2'], rows_per_chunk=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2]
+    assert pd.concat(chunks)['co2'].tolist() == \
+        COLUMNS['co2'].astype(float).tolist()
+    assert len(dobj.reported) == 1
+    assert len(mapped) == (1 if local else 0)
+    assert len(posted) == (0 if local else 3)
+    # Calls outside of iter_chunks report again.
+    dobj.get(['co2'], offset=0, length=2)
+    assert len(dobj.reported) == 2
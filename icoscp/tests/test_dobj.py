@@ -0,0 +1,297 @@
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from icoscp_core.metacore import StationTimeSeriesMeta, UriResource, VarMeta
+from icoscp_core.queries.dataobjlist import DataObjectLite
+
+from icoscp import dobj as dobj_module
+from icoscp import tableformat
+from icoscp.const import CP_META
+from icoscp.dobj import Dobj
+from icoscp.dtypepolicy import LEAN
+from icoscp.exceptions import UriValueError
+
+
+@pytest.fixture
+def requested(monkeypatch):
+    requested = []
+
+    def get_parsed(url, data_class):
+        requested.append(url)
+        if url.endswith('missing'):
+            raise LookupError(url)
+        return {'uri': url}
+
+    monkeypatch.setattr(dobj_module.metacache, 'get_parsed', get_parsed)
+    return requested
+
+
+def test_from_many_preserves_order_and_deduplicates(requested):
+    uris = ['https://meta.icos-cp.eu/objects/b', 'a',
+            'https://meta.icos-cp.eu/objects/a', 'missing', 42]
+    with pytest.warns(RuntimeWarning, match='2 of 4'):
+        result = Dobj.from_many(uris, max_workers=2)
+    assert [r.id for r in result[:3]] == [
+        'https://meta.icos-cp.eu/objects/b',
+        'https://meta.icos-cp.eu/objects/a',
+        'https://meta.icos-cp.eu/objects/a']
+    assert result[1] is result[2]
+    assert isinstance(result[3], LookupError)
+    assert isinstance(result[4], UriValueError)
+    assert sorted(requested) == ['https://meta.icos-cp.eu/objects/a',
+                                 'https://meta.icos-cp.eu/objects/b',
+                                 'https://meta.icos-cp.eu/objects/missing']
+
+
+def test_batch_get_bounds_downloads_in_flight():
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+
+    class Fake(Dobj):
+        def __init__(self, uri):
+            self.data_obj_uri = uri
+
+        def get(self, columns=None, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return self.data_obj_uri
+
+    uris = [f'https://meta.icos-cp.eu/objects/{i}' for i in range(20)]
+    result = dict(dobj_module.batch_get([Fake(u) for u in uris],
+                                        max_workers=3))
+    assert sorted(df for df in result.values()) == sorted(uris)
+    assert 1 < peak[0] <= 3
+
+
+def test_batch_get_raises_first_error():
+    class Failing(Dobj):
+        def __init__(self):
+            pass
+
+        def get(self, columns=None, **kwargs):
+            raise LookupError
+
+    with pytest.raises(LookupError):
+        list(dobj_module.batch_get([Failing(), Failing()]))
+
+
+def test_lite_properties_need_no_metadata(requested):
+    lite = DataObjectLite(
+        uri='https://meta.icos-cp.eu/objects/lite', filename='lite.csv',
+        size_bytes=1024, datatype_uri='http://meta.icos-cp.eu/resources/spec',
+        station_uri=None, sampling_height=None,
+        submission_time=datetime(2024, 1, 2, tzinfo=timezone.utc),
+        time_start=datetime(2023, 1, 1, tzinfo=timezone.utc),
+        time_end=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    dobj = Dobj(lite)
+    assert dobj.id == lite.uri
+    assert (dobj.filename, dobj.size, dobj.spec) == \
+        ('lite.csv', 1024, lite.datatype_uri)
+    assert dobj.time_end - dobj.time_start == timedelta(days=365)
+    assert requested == []
+    assert dobj.metadata == {'uri': lite.uri}
+    assert requested == [lite.uri]
+
+
+class FakeDataClient:
+    def __init__(self, columns):
+        self.columns = columns
+        self.requested = []
+        self.windows = []
+
+    def get_columns_as_arrays(self, dobj, columns=None, offset=None,
+                              length=None):
+        self.requested.append(columns)
+        self.windows.append((offset, length))
+        names = list(self.columns) if columns is None else columns
+        first = offset or 0
+        last = None if length is None else first + length
+        return {name: self.columns[name][first:last] for name in names}
+
+
+def fake_dobj(monkeypatch, columns):
+    def column(label):
+        kind = 'bmpChar' if columns[label].dtype.kind == 'U' else 'float64'
+        return VarMeta(model=UriResource(uri=label, label=None,
+                                         comments=[]),
+                       label=label, valueType=None,
+                       valueFormat=f'{CP_META}{kind}',
+                       isFlagFor=None, minMax=None,
+                       instrumentDeployments=None)
+
+    client = FakeDataClient(columns)
+    n_rows = len(next(iter(columns.values())))
+    dobj = Dobj('https://meta.icos-cp.eu/objects/fake')
+    dobj._metadata = SimpleNamespace(
+        specificInfo=StationTimeSeriesMeta(
+            acquisition=None, productionInfo=None, nRows=n_rows,
+            coverage=None,
+            columns=[column(label) for label in columns]),
+        nextVersion=None)
+    monkeypatch.setattr(dobj_module, 'get_data_client', lambda: client)
+    return dobj, client
+
+
+def test_get_downloads_only_missing_columns(monkeypatch):
+    dobj, client = fake_dobj(monkeypatch, {
+        'TIMESTAMP': np.arange(4.), 'a': np.ones(4), 'b': np.zeros(4)})
+    assert list(dobj.get(['a']).columns) == ['a']
+    assert list(dobj.get(['a', 'b']).columns) == ['a', 'b']
+    df = dobj.data
+    assert list(df.columns) == ['TIMESTAMP', 'a', 'b']
+    assert client.requested == [['a'], ['b'], ['TIMESTAMP']]
+    # Windows of kept columns are served without a download.
+    assert dobj.get(['b'], offset=1, length=2)['b'].tolist() == [0, 0]
+    assert len(client.requested) == 3
+    # Changes to a returned frame do not alter the kept columns.
+    df.loc[0, 'a'] = 5
+    assert dobj.get(['a'])['a'].tolist() == [1, 1, 1, 1]
+
+
+def test_get_does_not_copy_columns(monkeypatch):
+    if not tableformat.copy_on_write():
+        # Before pandas 3, columns are only shared with copy on write.
+        monkeypatch.setattr(pd.options.mode, 'copy_on_write', True)
+    columns = {
+        'b': np.zeros(1000),
+        'TIMESTAMP': np.arange(1000).astype('datetime64[ms]'),
+        'a': np.ones(1000, dtype=np.float32)}
+    dobj, _ = fake_dobj(monkeypatch, columns)
+    df = dobj.get()
+    assert list(df.columns) == ['TIMESTAMP', 'a', 'b']
+    for name, values in columns.items():
+        assert np.shares_memory(df[name].to_numpy(), values)
+    df.loc[0, 'b'] = 5.
+    assert dobj.get()['b'][0] == 0
+
+
+def test_get_peak_memory(monkeypatch):
+    # The default pandas options, with or without copy on write.
+    n_rows = 4_000_000
+    columns = {
+        'b': np.zeros(n_rows),
+        'TIMESTAMP': np.arange(n_rows).astype('datetime64[ms]'),
+        'a': np.ones(n_rows, dtype=np.float32)}
+    dobj, _ = fake_dobj(monkeypatch, columns)
+
+    def peak(**kwargs):
+        tracemalloc.start()
+        try:
+            dobj.get(**kwargs)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # Downloaded rows are not copied, a copy of 'a' alone is 8 MB.
+    assert peak(offset=1000, length=n_rows // 2) < 2**20
+    # Kept columns are copied once, only without copy on write.
+    size = sum(values.nbytes for values in columns.values())
+    copied = 0 if tableformat.copy_on_write() else size
+    assert peak() < copied + 2**20
+    # Only the rows of a window of kept columns are copied.
+    assert peak(offset=1000, length=1000) < 2**20
+
+
+def test_get_arrow_format(monkeypatch):
+    pa = pytest.importorskip('pyarrow')
+    timestamps = np.arange(4).astype('datetime64[ms]')
+    values = np.arange(4.)
+    dobj, _ = fake_dobj(monkeypatch, {
+        'TIMESTAMP': timestamps, 'co2': values,
+        'Flag': np.array(['O', 'N', 'O', 'O'])})
+    table = dobj.get(format='arrow', offset=1)
+    assert table.column_names == ['Flag', 'TIMESTAMP', 'co2']
+    assert table.schema.field('TIMESTAMP').type == pa.timestamp('ms')
+    assert pa.types.is_dictionary(table.schema.field('Flag').type)
+    assert table.column('Flag').to_pylist() == ['N', 'O', 'O']
+    assert table.column('co2').to_pylist() == [1, 2, 3]
+    # The numeric buffer is the decoded one.
+    buffer = table.column('co2').chunk(0).buffers()[1]
+    assert buffer.address == values[1:].ctypes.data
+
+
+def test_get_polars_format(monkeypatch):
+    pytest.importorskip('pyarrow')
+    pl = pytest.importorskip('polars')
+    dobj, _ = fake_dobj(monkeypatch, {
+        'TIMESTAMP': np.arange(3).astype('datetime64[ms]'),
+        'Flag': np.array(['O', 'N', 'O'])})
+    df = dobj.get(format='polars')
+    assert df.schema['TIMESTAMP'] == pl.Datetime('ms')
+    assert df.schema['Flag'] == pl.Categorical
+    assert df['Flag'].to_list() == ['O', 'N', 'O']
+
+
+def test_get_rejects_unknown_format(monkeypatch):
+    dobj, _ = fake_dobj(monkeypatch, {'a': np.ones(2)})
+    with pytest.raises(ValueError, match='csv'):
+        dobj.get(format='csv')
+
+
+def test_get_with_dtypes_policy(monkeypatch):
+    dobj, _ = fake_dobj(monkeypatch, {
+        'TIMESTAMP': np.arange(4).astype('datetime64[ms]'),
+        'Flag': np.array(['O', 'N', 'O', 'O'])})
+    df = dobj.get(dtypes=LEAN, offset=2)
+    assert df['Flag'].dtype == 'category'
+    assert df['TIMESTAMP'].tolist() == [2, 3]
+    assert 'bytes_saved' in df.attrs
+    with pytest.raises(ValueError, match='pandas'):
+        dobj.get(dtypes=LEAN, format='arrow')
+
+
+@pytest.mark.parametrize('hours, rows, window', [
+    ([0, 1, 2, 3, 4, 5], [1, 2, 3], (1, 3)),
+    # Rows 1 to 4 span the window, row 2 is outside of it.
+    ([0, 3, 5, 1, 2, 4], [1, 3, 4], (1, 4))])
+def test_get_time_window(monkeypatch, hours, rows, window):
+    dobj, client = fake_dobj(monkeypatch, {
+        'TIMESTAMP': np.datetime64('2023-01-01T00', 'ms') +
+        np.array(hours) * np.timedelta64(1, 'h'),
+        'co2': np.arange(6.)})
+    df = dobj.get(['co2'], start='2023-01-01T01:00',
+                  end='2023-01-01T04:00Z')
+    assert df['co2'].tolist() == rows
+    # The TIMESTAMP column, then the rows of the window.
+    assert client.requested == [['TIMESTAMP'], ['co2']]
+    assert client.windows == [(None, None), window]
+    with pytest.raises(ValueError, match='offset'):
+        dobj.get(start='2023-01-01', offset=1)
+
+
+def test_iter_chunks_downloads_row_windows(monkeypatch):
+    dobj, client = fake_dobj(monkeypatch, {'a': np.arange(5.)})
+    chunks = list(dobj.iter_chunks(rows_per_chunk=2))
+    assert [chunk['a'].tolist() for chunk in chunks] == [[0, 1], [2, 3], [4]]
+    assert client.windows == [(0, 2), (2, 2), (4, 1)]
+    with pytest.raises(ValueError, match='rows_per_chunk'):
+        next(dobj.iter_chunks(rows_per_chunk=0))
+
+
+def test_get_filters_rows_before_building_the_frame(monkeypatch):
+    dobj, _ = fake_dobj(monkeypatch, {
+        'TIMESTAMP': np.array(['2023-01-01T00', '2023-01-01T01',
+                               '2023-01-01T02', '2023-01-01T03'],
+                              dtype='datetime64[ms]'),
+        'Flag': np.array(['O', 'N', 'U', 'O']),
+        'co2': np.array([400., 401., 402., 403.])})
+    df = dobj.get(columns=['co2'], filters=[
+        ('Flag', 'in', ['O', 'U']),
+        ('TIMESTAMP', '<', '2023-01-01T03:00+00:00')])
+    assert df.to_dict('list') == {'co2': [400, 402]}
+    # Rows which do not match are not kept in the object.
+    assert dobj._columns == {}
+    df = dobj.get(filters=[('co2', '>=', 401)], offset=1, length=2)
+    assert df['Flag'].tolist() == ['N', 'U']
+    with pytest.raises(ValueError, match='operator'):
+        dobj.get(filters=[('co2', '~', 1)])
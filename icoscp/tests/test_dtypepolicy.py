@@ -0,0 +1,75 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from icoscp.dtypepolicy import LEAN, DtypePolicy, apply
+
+CP = 'http://meta.icos-cp.eu/ontologies/cpmeta/'
+FORMATS = {'Flag': f'{CP}bmpChar', 'co2': f'{CP}float32',
+           'TIMESTAMP': f'{CP}iso8601dateTime', 'rh': f'{CP}float64'}
+
+
+@pytest.fixture
+def df():
+    n = 1000
+    return pd.DataFrame({
+        'Flag': np.array(['O', 'N'] * (n // 2)),
+        'TIMESTAMP': np.arange(n).astype('datetime64[ms]'),
+        'co2': np.linspace(400, 410, n, dtype=np.float32).astype(np.float64),
+        'rh': np.linspace(0, 1, n)})
+
+
+def test_default_policy_keeps_types(df):
+    result = apply(df, DtypePolicy(), FORMATS)
+    assert result.dtypes.equals(df.dtypes)
+    assert result.attrs['bytes_saved'] == 0
+
+
+def test_lean_policy(df):
+    result = apply(df, LEAN, FORMATS)
+    assert result['Flag'].dtype == 'category'
+    assert result['TIMESTAMP'].tolist()[:2] == [0, 1]
+    assert result['co2'].dtype == np.float32
+    # Only variables stored as 32 bit floats are downcast.
+    assert result['rh'].dtype == np.float64
+    assert result['co2'].astype(np.float64).equals(df['co2'])
+    saved = df.memory_usage(index=False, deep=True).sum() - \
+        result.memory_usage(index=False, deep=True).sum()
+    assert result.attrs['bytes_saved'] == saved > 0
+
+
+def test_flag_codes(df):
+    result = apply(df, DtypePolicy(flags='codes'), FORMATS)
+    assert result['Flag'].dtype == np.uint16
+    assert result['Flag'].tolist()[:2] == [ord('O'), ord('N')]
+
+
+def test_missing_values_are_nullable(df):
+    df['Flag'] = df['Flag'].astype(object)
+    df.loc[1, ['Flag', 'TIMESTAMP']] = None
+    result = apply(df, DtypePolicy(flags='codes', raw_timestamps=True),
+                   FORMATS)
+    assert result['Flag'].dtype == 'UInt16'
+    assert result['Flag'].tolist()[:3] == [ord('O'), pd.NA, ord('O')]
+    assert result['TIMESTAMP'].dtype == 'Int64'
+    assert result['TIMESTAMP'].tolist()[:3] == [0, pd.NA, 2]
+
+
+@pytest.mark.parametrize('flags', ['category', 'codes'])
+def test_only_flag_columns_are_converted(df, flags):
+    df['time'] = [dt.time(i % 24) for i in range(len(df))]
+    df['station'] = 'HTM'
+    formats = {**FORMATS, 'time': f'{CP}iso8601timeOfDay',
+               'station': None}
+    result = apply(df, DtypePolicy(flags=flags), formats)
+    assert result['time'].tolist() == df['time'].tolist()
+    assert result['station'].tolist() == df['station'].tolist()
+    assert result['time'].dtype == object
+    assert result['Flag'].dtype != df['Flag'].dtype
+
+
+def test_unknown_flag_type():
+    with pytest.raises(ValueError, match='int8'):
+        DtypePolicy(flags='int8')
@@ -0,0 +1,77 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import ClassVar
+
+import pytest
+
+from icoscp.metacache import MetaCache
+
+DOCUMENTS = {
+    '/objects/current': {'fileName': 'current.csv', 'nextVersion': None},
+    '/objects/old': {'fileName': 'old.csv', 'nextVersion': 'new'},
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests: ClassVar[list] = []
+
+    def do_GET(self):
+        etag = f'"{self.path}"'
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path not in DOCUMENTS:
+            self.send_response(404)
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+        else:
+            body = json.dumps(DOCUMENTS[self.path]).encode()
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    httpd = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,),
+                              daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+
+def test_fresh_documents_are_not_requested_again(server):
+    metacache = MetaCache(max_age=60)
+    url = f'{server}/objects/current'
+    assert json.loads(metacache.get(url))['fileName'] == 'current.csv'
+    assert metacache.get(url) == metacache.get(url)
+    assert len(Handler.requests) == 1
+
+
+def test_stale_documents_are_revalidated(server):
+    metacache = MetaCache(max_age=0)
+    url = f'{server}/objects/current'
+    text = metacache.get(url)
+    assert metacache.get(url) == text
+    assert Handler.requests == [('/objects/current', None),
+                                ('/objects/current', '"/objects/current"')]
+
+
+def test_documents_with_next_version_are_frozen(server):
+    metacache = MetaCache(max_age=0)
+    url = f'{server}/objects/old'
+    metacache.get(url)
+    metacache.get(url)
+    assert len(Handler.requests) == 1
+
+
+def test_missing_document(server):
+    assert MetaCache().get(f'{server}/objects/missing') is None
@@ -0,0 +1,47 @@
+import threading
+
+import requests
+
+from icoscp import portaluse
+from icoscp.portaluse import Dispatcher
+
+
+class RecordingDispatcher(Dispatcher):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.events = []
+        self.release = threading.Event()
+
+    def _send(self, event):
+        self.release.wait(timeout=5)
+        self.events.append(event)
+
+
+def test_events_are_sent_in_order():
+    dispatcher = RecordingDispatcher()
+    for i in range(5):
+        assert dispatcher.submit({'event': i})
+    dispatcher.release.set()
+    assert dispatcher.flush(timeout=5)
+    assert [event['event'] for event in dispatcher.events] == list(range(5))
+
+
+def test_failed_posts_are_logged(monkeypatch, caplog):
+    def post(url, json, timeout):
+        msg = 'offline'
+        raise requests.ConnectionError(msg)
+
+    monkeypatch.setattr(portaluse.session, 'post', post)
+    Dispatcher()._send({'event': 0})
+    assert caplog.records[0].name == 'icoscp.portaluse'
+    assert caplog.records[0].getMessage() == \
+        'Reporting data usage failed: offline'
+
+
+def test_full_queue_drops_events():
+    dispatcher = RecordingDispatcher(maxsize=2)
+    results = [dispatcher.submit({'event': i}) for i in range(10)]
+    assert not all(results)
+    assert dispatcher.dropped == results.count(False)
+    dispatcher.release.set()
+    assert dispatcher.flush(timeout=5)
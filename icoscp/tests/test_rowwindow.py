@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from icoscp.rowwindow import check_window, time_window
+
+MS = 1.5e12 + 3.6e6 * np.arange(10)
+
+
+def test_time_window_sorted():
+    start, end = np.datetime64(int(MS[2]), 'ms'), np.datetime64(int(MS[5]), 'ms')
+    assert time_window(MS, start, end) == (2, 3, None)
+    assert time_window(MS.astype('datetime64[ms]'), start, end) == (2, 3, None)
+    assert time_window(MS, end=start) == (0, 2, None)
+
+
+def test_time_window_unsorted():
+    values = MS[[0, 5, 9, 2, 3, 7]]
+    offset, length, mask = time_window(values, np.datetime64(int(MS[2]), 'ms'),
+                                       np.datetime64(int(MS[6]), 'ms'))
+    assert (offset, length) == (1, 4)
+    assert mask.tolist() == [True, False, True, True]
+    assert time_window(values, end=np.datetime64(int(MS[0]), 'ms')) == \
+        (0, 0, None)
+
+
+def test_check_window():
+    assert check_window(None, None, 10) == (0, 10)
+    assert check_window(8, 5, 10) == (8, 2)
+    with pytest.raises(ValueError):
+        check_window(11, None, 10)
+    with pytest.raises(ValueError):
+        check_window(0, -1, 10)
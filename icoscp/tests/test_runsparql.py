@@ -0,0 +1,430 @@
+import asyncio
+import csv
+import io
+import json
+import re
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from icoscp import cache, session
+from icoscp.sparql import coltypes, paging, resultcache, runsparql
+from icoscp.sparql.jsonstream import BindingsStream
+from icoscp.sparql.runsparql import RunSparql
+
+RESULT = {
+    'head': {'vars': ['dobj', 'size']},
+    'results': {'bindings': [
+        {'dobj': {'type': 'uri', 'value': f'https://meta.icos-cp.eu/{i}'},
+         'size': {'type': 'literal', 'value': str(i)}}
+        for i in range(5)] + [
+        {'dobj': {'type': 'uri', 'value': 'x, "y" ] {z}'}}]}}
+
+
+class FakeResponse:
+    ok = True
+    reason = 'OK'
+    encoding = None
+
+    def __init__(self, text, chunk_size=7,
+                 content_type='application/sparql-results+json'):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.closed = False
+        self.headers = {'Content-Type': content_type}
+        self.raw = io.BytesIO(text.encode())
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size, decode_unicode):
+        for i in range(0, len(self.text), self.chunk_size):
+            yield self.text[i:i + self.chunk_size]
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def to_csv(result):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(result['head']['vars'])
+    for b in result['results']['bindings']:
+        writer.writerow([b.get(v, {}).get('value', '')
+                         for v in result['head']['vars']])
+    return out.getvalue()
+
+
+class Posted(list):
+    # The fake endpoint ignores the text/csv Accept header if set.
+    json_only = False
+    # Most requests answered at the same time.
+    max_in_flight = 0
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Called while a request is answered."""
+
+
+@pytest.fixture
+def posted(monkeypatch):
+    posted = Posted()
+
+    def post(url, headers, data, stream=False):
+        with posted.lock:
+            posted.append({'headers': headers, 'stream': stream})
+            posted.in_flight += 1
+            posted.max_in_flight = max(posted.max_in_flight,
+                                       posted.in_flight)
+        try:
+            posted.wait()
+        finally:
+            with posted.lock:
+                posted.in_flight -= 1
+        if headers['Accept'].startswith('text/csv') and \
+                not posted.json_only:
+            response = FakeResponse(to_csv(RESULT), content_type='text/csv')
+        else:
+            response = FakeResponse(json.dumps(RESULT))
+        posted[-1]['response'] = response
+        return response
+
+    monkeypatch.setattr(runsparql.session, 'post', post)
+    return posted
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64, 10**6])
+def test_bindings_stream(chunk_size):
+    text = json.dumps(RESULT, indent=1)
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    stream = BindingsStream(chunks)
+    assert stream.vars == ['dobj', 'size']
+    assert list(stream) == RESULT['results']['bindings']
+
+
+def test_bindings_stream_head_after_results():
+    text = json.dumps({'results': RESULT['results'], 'head': RESULT['head']})
+    stream = BindingsStream([text])
+    assert stream.vars == ['dobj', 'size']
+    assert len(list(stream)) == 6
+
+
+def test_bindings_stream_rejects_truncated_result():
+    text = json.dumps(RESULT)[:-30]
+    with pytest.raises(ValueError):
+        list(BindingsStream([text]))
+
+
+def test_iter_rows(posted):
+    rows = list(RunSparql('select *', output_format='iter').run())
+    assert posted[0]['stream']
+    assert posted[0]['response'].closed
+    assert rows[0] == {'dobj': 'https://meta.icos-cp.eu/0', 'size': '0'}
+    assert rows[-1] == {'dobj': 'x, "y" ] {z}', 'size': None}
+
+
+def test_iter_rows_in_batches(posted):
+    batches = list(RunSparql('select *').iter_rows(batch_size=4))
+    assert [len(b) for b in batches] == [4, 2]
+    assert list(batches[0].columns) == ['dobj', 'size']
+
+
+@pytest.mark.parametrize('output_format', ['pandas', 'array', 'csv'])
+def test_csv_transport_matches_json(posted, output_format):
+    expected = RunSparql('select *', output_format=output_format).run()
+    result = RunSparql('select *', output_format=output_format,
+                       transport='csv').run()
+    assert posted[1]['headers']['Accept'].startswith('text/csv')
+    assert posted[1]['response'].closed
+    if output_format == 'pandas':
+        pd.testing.assert_frame_equal(result, expected)
+    else:
+        assert result == expected
+
+
+def test_csv_transport_falls_back_to_json(posted):
+    posted.json_only = True
+    df = RunSparql('select *', output_format='pandas', transport='csv').run()
+    assert len(df) == 6
+    with pytest.raises(ValueError, match='transport'):
+        RunSparql('select *', transport='xml')
+
+
+def test_typed_frame():
+    xsd = 'http://www.w3.org/2001/XMLSchema#'
+
+    def literal(value, datatype):
+        return {'type': 'literal', 'value': value,
+                'datatype': f'{xsd}{datatype}'}
+
+    station = {'type': 'uri', 'value': 'http://meta.icos-cp.eu/resources/s'}
+    data = {
+        'head': {'vars': ['station', 'lat', 'height', 'start', 'label']},
+        'results': {'bindings': [
+            {'station': station, 'lat': literal('56.1', 'double'),
+             'height': literal('150', 'long'),
+             'start': literal('2020-01-01T00:00:00Z', 'dateTime'),
+             'label': {'type': 'literal', 'value': 'a'}},
+            {'station': station, 'lat': literal('56.2', 'double'),
+             'height': literal('150', 'float'),
+             'start': literal('2021-01-01T00:00:00Z', 'dateTime')}]}}
+    df = coltypes.typed_frame(data)
+    assert df['station'].dtype == 'category'
+    assert df['lat'].tolist() == [56.1, 56.2]
+    # Mixed datatypes are kept as strings.
+    assert df['height'].tolist() == ['150', '150']
+    assert df['start'].dt.year.tolist() == [2020, 2021]
+    assert str(df['start'].dt.tz) == 'UTC'
+    assert df['label'].tolist()[0] == 'a' and pd.isna(df['label'][1])
+
+
+def test_typed_output(posted):
+    df = RunSparql('select *', output_format='pandas', typed=True,
+                   transport='csv').run()
+    assert posted[0]['headers']['Accept'] == 'application/json'
+    assert df['size'].tolist()[:5] == ['0', '1', '2', '3', '4']
+    colname, rows = RunSparql('select *', output_format='array',
+                              typed=True).run()
+    assert colname == ['dobj', 'size'] and rows[-1][1] is None
+
+
+def test_csv_output_is_escaped(posted):
+    text = RunSparql('select *', output_format='csv').run()
+    assert posted[0]['stream'] and posted[0]['response'].closed
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == ['dobj', 'size']
+    assert rows[1] == ['https://meta.icos-cp.eu/0', '0']
+    assert rows[-1] == ['x, "y" ] {z}', '']
+    assert text == to_csv(RESULT).replace('\r\n', '\n')
+
+
+def test_write_csv_to_file(posted, tmp_path):
+    path = tmp_path / 'result.csv'
+    with open(path, 'w', newline='') as f:
+        assert RunSparql('select *').write_csv(f) is None
+    assert path.read_text() == RunSparql('select *').write_csv()
+
+
+@pytest.fixture
+def results():
+    yield resultcache.enable()
+    resultcache.disable()
+
+
+def test_result_cache(posted, results):
+    df = RunSparql('select *', output_format='pandas').run()
+    # Same query with other whitespace and another output format.
+    data = RunSparql(' select\n  * ', output_format='dict').run()
+    assert len(posted) == 1
+    assert (results.hits, results.misses) == (1, 1)
+    assert len(df) == len(data['results']['bindings']) == 6
+    assert RunSparql('select *', output_format='csv').run() == \
+        to_csv(RESULT).replace('\r\n', '\n')
+    # Whitespace in literals is significant.
+    RunSparql('select * where {?s ?p "a  b"}').run()
+    RunSparql('select * where {?s ?p "a b"}').run()
+    assert len(posted) == 3
+
+
+def test_result_cache_ignores_comments(posted, results):
+    query = 'select * where {?s ?p <http://a.b/c#d>}'
+    RunSparql(f'{query} # limit 10\nlimit 5').run()
+    RunSparql(f'{query}  limit 5 # first rows').run()
+    assert len(posted) == 1
+    # The rest of a line is commented out.
+    RunSparql(f'{query} # limit 10 limit 5').run()
+    RunSparql(f'{query}').run()
+    assert len(posted) == 2
+    # Hashes in IRIs and literals are no comments.
+    RunSparql('select * where {?s ?p <http://a.b/c#e>}').run()
+    RunSparql('select * where {?s ?p "#d"}').run()
+    assert len(posted) == 4
+
+
+def test_result_cache_is_bypassed(posted, results):
+    for _ in range(2):
+        RunSparql('select *', output_format='dict', disable_cache=True).run()
+        list(RunSparql('select *', output_format='iter').run())
+    assert len(posted) == 4
+    assert results.hits == results.misses == 0
+
+
+def test_result_cache_expires(posted, results, monkeypatch):
+    RunSparql('select *', output_format='dict', cache_ttl=10).run()
+    RunSparql('select *', output_format='dict').run()
+    now = resultcache.time.time()
+    monkeypatch.setattr(resultcache.time, 'time', lambda: now + 11)
+    RunSparql('select *', output_format='dict').run()
+    assert len(posted) == 2
+    assert (results.hits, results.misses) == (1, 2)
+
+
+def test_result_cache_size_limit(posted, monkeypatch):
+    results = resultcache.ResultCache(max_bytes=2 * len(json.dumps(RESULT)))
+    monkeypatch.setattr(resultcache, '_cache', results)
+    for query in ['select 1', 'select 2', 'select 3', 'select 1']:
+        RunSparql(query, output_format='dict').run()
+    assert len(posted) == 4
+    assert results.misses == 4
+
+
+def test_result_cache_on_disk(posted, tmp_path):
+    cache.enable(tmp_path)
+    try:
+        resultcache.enable()
+        RunSparql('select *', output_format='pandas', transport='csv').run()
+        # A new session finds the result on disk.
+        results = resultcache.enable()
+        df = RunSparql('select *', output_format='pandas',
+                       transport='csv').run()
+    finally:
+        resultcache.disable()
+        cache.disable()
+    assert len(posted) == 1 and results.hits == 1
+    assert len(df) == 6
+    assert len(list((tmp_path / 'sparql').iterdir())) == 1
+
+
+def test_arun_sends_queries_concurrently(posted):
+    # Every request waits until all nine are in flight.
+    posted.wait = threading.Barrier(9, timeout=10).wait
+
+    async def main():
+        queries = [RunSparql(f'select {i}', output_format=fmt)
+                   for i, fmt in enumerate(['pandas', 'dict', 'csv'] * 3)]
+        return await asyncio.gather(*[q.arun() for q in queries])
+
+    results = asyncio.run(main())
+    assert len(posted) == posted.max_in_flight == 9
+    posted.wait = lambda: None
+    pd.testing.assert_frame_equal(
+        results[0], RunSparql('select *', output_format='pandas').run())
+    assert results[1] == RESULT
+    assert results[2] == to_csv(RESULT).replace('\r\n', '\n')
+
+
+def test_arun_concurrency_limit(posted):
+    posted.wait = lambda: time.sleep(0.01)
+    shared = session.get_session()
+    runsparql.set_concurrency(2)
+
+    async def main():
+        await asyncio.gather(*[RunSparql('select *').arun()
+                               for _ in range(6)])
+
+    try:
+        asyncio.run(main())
+        assert len(posted) == 6 and posted.max_in_flight <= 2
+        # Only the pool to the endpoint is resized.
+        assert session.get_session() is shared
+        assert shared.get_adapter('https://meta.icos-cp.eu/sparql')\
+            ._pool_maxsize == 2
+    finally:
+        runsparql.set_concurrency(runsparql.CPC.SPARQL_MAX_CONCURRENCY)
+    with pytest.raises(ValueError):
+        runsparql.set_concurrency(0)
+
+
+ROWS = [{'dobj': {'type': 'uri', 'value': f'https://meta.icos-cp.eu/{i:02}'}}
+        for i in range(23)]
+
+
+class Pages(list):
+    # Offsets of the requested pages, and the most pages in flight.
+    max_in_flight = 0
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """A fake endpoint which answers paged queries of ROWS."""
+    pages = Pages()
+    lock = threading.Lock()
+    in_flight = 0
+
+    def post(url, headers, data, stream=False):
+        nonlocal in_flight
+        query = data.decode()
+        assert 'SELECT * from <g> WHERE { {\nselect ?dobj' in query
+        limit, offset = re.search(r'LIMIT (\d+)(?: OFFSET (\d+))?$',
+                                  query).groups('0')
+        limit, offset = int(limit), int(offset)
+        if limit:
+            assert 'ORDER BY ?dobj LIMIT' in query
+            with lock:
+                pages.append(offset)
+                in_flight += 1
+                pages.max_in_flight = max(pages.max_in_flight, in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight -= 1
+        return FakeResponse(json.dumps({
+            'head': {'vars': ['dobj']},
+            'results': {'bindings': ROWS[offset:offset + limit]}}))
+
+    monkeypatch.setattr(runsparql.session, 'post', post)
+    return pages
+
+
+@pytest.mark.parametrize('page_size', [1, 5, 23, 100])
+def test_paged_query(pages, page_size):
+    query = 'prefix cpmeta: <x#>\nselect ?dobj from <g> where {?dobj ?p ?o}'
+    data = RunSparql(query, output_format='dict', page_size=page_size,
+                     max_workers=3).run()
+    assert data['results']['bindings'] == ROWS
+    # The full pages, the last page with less rows, and at most two
+    # more pages which were requested ahead.
+    needed = len(ROWS) // page_size + 1
+    assert needed <= len(pages) <= needed + 2
+    assert sorted(pages) == [i * page_size for i in range(len(pages))]
+    assert pages.max_in_flight <= 3
+
+
+def test_paged_output_formats(pages):
+    query = 'select ?dobj from <g> where {?dobj ?p ?o} # comment'
+    df = RunSparql(query, output_format='pandas', page_size=5).run()
+    assert df['dobj'].tolist() == [r['dobj']['value'] for r in ROWS]
+    rows = list(RunSparql(query, page_size=5).iter_rows())
+    assert rows == df.to_dict('records')
+    text = RunSparql(query, output_format='csv', page_size=5).run()
+    assert text.splitlines()[1:] == df['dobj'].tolist()
+    batches = RunSparql(query, page_size=4).iter_rows(batch_size=10)
+    assert [len(b) for b in batches] == [10, 10, 3]
+
+
+def test_paging_keeps_the_order_of_the_query():
+    query = ('select ?s ?o where {?s ?p ?o {select * {?a ?b ?c} '
+             'order by ?c}} Order By desc(?o) strlen("order by ?x")\n'
+             'limit 10 # order by ?y')
+    assert paging.order(query) == 'desc(?o) strlen("order by ?x")'
+    assert paging.page(query, ['s', 'o'], 5, 0).endswith(
+        '} } ORDER BY desc(?o) strlen("order by ?x") ?s ?o LIMIT 5 OFFSET 0')
+    assert paging.order('select * {?s ?p "order by ?o"}') == ''
+    assert paging.page('select * {?s ?p ?o}', [], 5, 0).endswith(
+        '} } LIMIT 5 OFFSET 0')
+
+
+def test_paging_rewrites_select_queries_only():
+    prologue, dataset, body = paging.split(
+        'PREFIX a: <x#>\nSELECT ?s FROM <g1> FROM NAMED <g2> {?s ?p ?o}')
+    assert prologue == 'PREFIX a: <x#>\n'
+    assert dataset == 'FROM <g1> FROM NAMED <g2>'
+    assert body == 'SELECT ?s   {?s ?p ?o}'
+    with pytest.raises(ValueError, match='SELECT'):
+        paging.page('ASK {?s ?p ?o}', [], 10, 0)
+    with pytest.raises(ValueError, match='page_size'):
+        RunSparql('select *', page_size=0)
@@ -0,0 +1,33 @@
+from icoscp.session import SessionProvider
+
+
+def test_host_pool_sizes():
+    provider = SessionProvider(pool_maxsize=4,
+                               host_pool_sizes={'data.icos-cp.eu': 16})
+    session = provider.session
+    assert session.get_adapter('https://data.icos-cp.eu/cpb')\
+        ._pool_maxsize == 16
+    assert session.get_adapter('https://meta.icos-cp.eu/sparql')\
+        ._pool_maxsize == 4
+    assert provider.session is session
+
+
+def test_configure_replaces_session():
+    provider = SessionProvider()
+    session = provider.session
+    provider.configure(timeout=3, pool_maxsize=2)
+    assert provider.timeout == 3
+    assert provider.session is not session
+    assert provider.session.get_adapter('https://meta.icos-cp.eu/')\
+        ._pool_maxsize == 2
+
+
+def test_set_host_pool_size_keeps_session():
+    provider = SessionProvider(pool_maxsize=4)
+    session = provider.session
+    data = session.get_adapter('https://data.icos-cp.eu/cpb')
+    provider.set_host_pool_size('meta.icos-cp.eu', 12)
+    assert provider.session is session
+    assert session.get_adapter('https://meta.icos-cp.eu/sparql')\
+        ._pool_maxsize == 12
+    assert session.get_adapter('https://data.icos-cp.eu/cpb') is data
@@ -5,9 +5,9 @@ from pathlib import Path
 from typing import Any, TypeAlias
 
 import pandas as pd
-import requests
 import xarray as xr
 from dacite import from_dict
+from icoscp import session
 from icoscp_core.cpb import ArraysDict
 from icoscp_core.icos import data, meta, station_class_lookup
 from icoscp_core.queries.dataobjlist import DataObjectLite
@@ -91,8 +91,8 @@ def list_stations() -> list[StiltStation]:
     :return:
         A list of `StiltStation` instances
     """
-    http_resp = requests.get(STILTINFO, headers={"Accept": "application/json"},
-                             timeout=HTTP_TIMEOUT_SEC)
+    http_resp = session.get(STILTINFO, headers={"Accept": "application/json"},
+                            timeout=HTTP_TIMEOUT_SEC)
     http_resp.raise_for_status()
     js: list[dict[str, Any]] = http_resp.json()
     return [from_dict(StiltStation, ss) for ss in js]
@@ -125,7 +125,7 @@ def fetch_result_ts(
 
     :return: pandas DataFrame with the requested time series
     """
-    http_resp = requests.post(
+    http_resp = session.post(
         url=STILTRAW if raw else STILTTS,
         json={
             'stationId': station_id,
@@ -190,9 +190,9 @@ def list_footprints(station_id: str, from_date: str, to_date: str) -> list[datet
         representing the time slots
     """
     params = {'stationId': station_id, 'fromDate': from_date, 'toDate': to_date}
-    http_resp = requests.get(STILT_VIEWER + "listfootprints",
-                             params=params,
-                             timeout=HTTP_TIMEOUT_SEC)
+    http_resp = session.get(STILT_VIEWER + "listfootprints",
+                            params=params,
+                            timeout=HTTP_TIMEOUT_SEC)
     http_resp.raise_for_status()
     js: list[str] = http_resp.json()
     return [datetime.fromisoformat(ts) for ts in js]
@@ -11,11 +11,12 @@ import json
 import os
 
 # Related third party imports.
+from icoscp import portaluse
+from icoscp import session
 from icoscp_core.icos import meta
 from icoscp_core.queries.dataobjlist import SamplingHeightFilter
 import numpy as np
 import pandas as pd
-import requests
 import xarray as xr
 
 # Local application/library specific imports.
@@ -171,7 +172,7 @@ class StiltStation():
             from_date = date_range[0].strftime('%Y-%m-%d')
             to_date = date_range[-1].strftime('%Y-%m-%d')
             columns = self.__columns(columns)
-            http_resp = requests.post(
+            http_resp = session.post(
                 url=self._url,
                 json={
                     'stationId': self.id,
@@ -346,7 +347,7 @@ class StiltStation():
                    'Accept-Charset': 'UTF-8'}
         data = '{"columns": ' + str(
             columns) + ',"fromDate": "' + s_date + '", "toDate": "' + e_date + '", "stationId": "' + self.id + '"}'
-        response = requests.post(c.STILTRAW, headers=headers, data=data)
+        response = session.post(c.STILTRAW, headers=headers, data=data)
 
         if response.status_code != 500:
             # Get response in json-format and read it in to a numpy array:
@@ -495,8 +496,8 @@ class StiltStation():
                 'data_type': dtype,
                 'version': release_version,  # Grabbed from '__init__.py'.
                 'internal': True}}}
-        server = 'https://cpauth.icos-cp.eu/logs/portaluse'
-        requests.post(server, json=counter)
+        # Sent in the background, data access does not wait for it.
+        portaluse.report(counter)
 
     def _raw_column_names(self):
         '''